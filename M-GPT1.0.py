@@ -1,11 +1,32 @@
 import tkinter as tk
 from tkinter import ttk
 import random
+import heapq
+from collections import OrderedDict
 import pygame
-import threading
+import multiprocessing
 from pygame.locals import *
 
+from level_store import LevelStore
+from frame_pacing import FixedStep
+from map_elites import EliteArchive
+from memdiag import MEMDIAG, MemoryDiagnostics
+from physics import GRAVITY, JUMP_FORCE, PLAYER_SPEED
+from runtime import init_pygame
+from tk_worker import BackgroundJob
+
+# Simulator rates
+PHYSICS_RATE = 60
+RENDER_FPS = 30
+
+# Most fitness scores kept; the least recently used are dropped first
+FITNESS_CACHE_SIZE = 10000
+
 class EvolutionaryMarioDataset:
+    population_size = 10
+    parent_pool = 4
+    elite_count = 2
+    
     def __init__(self):
         self.base_patterns = {
             'ground': ['GGGG', 'G  G'],
@@ -15,9 +36,11 @@ class EvolutionaryMarioDataset:
             'stairs': [' G ', 'GG ']
         }
         self.population = self.initialize_population()
+        self.scored = None  # (score, pattern) for the current population
         
     def initialize_population(self):
-        return [random.choice(p) for p in random.choice(list(self.base_patterns.values()))]
+        patterns = [p for group in self.base_patterns.values() for p in group]
+        return random.sample(patterns, min(self.population_size, len(patterns)))
     
     def mutate(self, pattern):
         if random.random() < 0.3 and len(pattern) > 1:
@@ -28,86 +51,201 @@ class EvolutionaryMarioDataset:
     
     def crossover(self, parent1, parent2):
         min_len = min(len(parent1), len(parent2))
+        if min_len < 2:
+            # Nothing to split; the child is one parent and mutation varies it
+            return random.choice((parent1, parent2))
         split = random.randint(1, min_len-1)
         return parent1[:split] + parent2[split:]
     
-    def evolve(self, fitness_scores):
-        sorted_pop = [x for _,x in sorted(zip(fitness_scores, self.population))]
-        elites = sorted_pop[-2:]
-        new_pop = elites.copy()
+    def best(self):
+        return max(self.scored)[1] if self.scored else None
+    
+    def evolve(self, fitness, immigrants=()):
+        """Advance one generation; ``fitness`` scores a single pattern.
         
-        while len(new_pop) < 10:
-            parent1, parent2 = random.choices(sorted_pop[-4:], k=2)
-            child = self.crossover(parent1, parent2)
-            new_pop.append(self.mutate(child))
+        Scores are kept with the population so survivors are never
+        rescored, and children already in the new population are dropped
+        before they reach ``fitness``. ``immigrants`` join the parent pool
+        for this generation only.
+        """
+        if self.scored is None:
+            self.scored = [(fitness(p), p) for p in self.population]
+        parents = heapq.nlargest(self.parent_pool, self.scored)
+        new_scored = parents[:self.elite_count]
+        members = {p for _, p in new_scored}
+        parent_patterns = [p for _, p in parents] + list(immigrants)
         
-        self.population = new_pop
+        # Bounded retries so a converged pool cannot spin forever
+        attempts = self.population_size * 10
+        while len(new_scored) < self.population_size and attempts:
+            attempts -= 1
+            parent1, parent2 = random.choices(parent_patterns, k=2)
+            child = self.mutate(self.crossover(parent1, parent2))
+            if child in members:
+                continue
+            members.add(child)
+            new_scored.append((fitness(child), child))
+        
+        self.scored = new_scored
+        self.population = [p for _, p in new_scored]
 
 class MarioGPT:
-    def __init__(self):
+    def __init__(self, store=None, diagnostics=None):
         self.dataset = EvolutionaryMarioDataset()
-        self.fitness_cache = {}
+        # Every evolved and generated level is kept here when given
+        self.store = store
+        self.fitness_cache = OrderedDict()
+        # Best pattern per (gaps, platform density, pipes) cell seen so far
+        self.archive = EliteArchive()
+        self.novelty_weight = 1.0
+        self.immigrants = 2
+        self.diagnostics = diagnostics
+        if diagnostics:
+            diagnostics.watch('fitness cache', lambda: len(self.fitness_cache), FITNESS_CACHE_SIZE)
+            diagnostics.watch('archive', lambda: len(self.archive))
+            diagnostics.watch('population', lambda: len(self.dataset.population))
         
     def calculate_fitness(self, pattern):
         key = ''.join(pattern)
         if key in self.fitness_cache:
+            self.fitness_cache.move_to_end(key)
             return self.fitness_cache[key]
         
         score = len(pattern) * 0.2
         score += pattern.count('G') * 0.5
         score -= pattern.count(' ') * 0.3
         self.fitness_cache[key] = score
+        if len(self.fitness_cache) > FITNESS_CACHE_SIZE:
+            self.fitness_cache.popitem(last=False)
         return score
     
-    def generate_level(self, prompt):
-        self.dataset.evolve([self.calculate_fitness(p) for p in self.dataset.population])
+    def score(self, pattern):
+        # Fitness for the archive, plus a bonus for being unlike it
+        fitness = self.calculate_fitness(pattern)
+        novelty = self.archive.novelty(pattern)
+        self.archive.add(pattern, fitness)
+        return fitness + self.novelty_weight * novelty
+    
+    def diverse_levels(self):
+        return self.archive.levels()
+    
+    def generate_level(self, prompt, generations=1, progress=None):
+        for generation in range(generations):
+            self.dataset.evolve(self.score, self.archive.sample(self.immigrants))
+            if self.store is not None:
+                population = self.dataset.population
+                self.store.add_many(population, 'evolve', prompt,
+                                    [self.calculate_fitness(p) for p in population])
+            if progress:
+                progress(generation + 1, generations, self.dataset.best())
+            if self.diagnostics:
+                self.diagnostics.tick()
         selected = random.choices(
             self.dataset.population,
-            weights=[self.calculate_fitness(p) for p in self.dataset.population],
+            weights=[score for score, _ in self.dataset.scored],
             k=10
         )
-        return '\n'.join(selected)
+        level = '\n'.join(selected)
+        if self.store is not None:
+            self.store.add(level, 'generate', prompt)
+        return level
 
-class PygameSimulator(threading.Thread):
-    def __init__(self, level_data):
-        super().__init__()
-        self.level_data = level_data
-        self.running = True
-        self.daught_exception = None
-        
-    def run(self):
-        try:
-            pygame.init()
-            self.screen = pygame.display.set_mode((800, 600))
-            self.clock = pygame.time.Clock()
+def run_simulator(conn):
+    """Simulator process: one pygame window, levels swapped in over ``conn``.
+
+    Receives ("level", level_data) to replace the running level in place and
+    ("quit", None) to exit. Closing the window also ends the process.
+    """
+    init_pygame()
+    screen = pygame.display.set_mode((800, 600))
+    pygame.display.set_caption("MarioGPT Simulator")
+    clock = pygame.time.Clock()
+    # Physics at the game rate, drawn at the simulator's lower frame rate
+    pacer = FixedStep(PHYSICS_RATE)
+    diagnostics = MemoryDiagnostics("M-GPT simulator") if MEMDIAG else None
+    
+    all_sprites = pygame.sprite.Group()
+    platforms = pygame.sprite.Group()
+    running = True
+    
+    try:
+        while running:
+            while conn.poll():
+                command, payload = conn.recv()
+                if command == "quit":
+                    running = False
+                elif command == "level":
+                    # Swap the level without touching the display
+                    all_sprites.empty()
+                    platforms.empty()
+                    for y, row in enumerate(payload.split('\n')):
+                        for x, char in enumerate(row):
+                            if char == 'G':
+                                Platform(x*32, y*32, platforms)
+                    all_sprites.add(Player(100, 100, platforms))
+                    pacer.reset()
             
-            self.all_sprites = pygame.sprite.Group()
-            self.platforms = pygame.sprite.Group()
+            for event in pygame.event.get():
+                if event.type == QUIT:
+                    running = False
             
-            for y, row in enumerate(self.level_data.split('\n')):
-                for x, char in enumerate(row):
-                    if char == 'G':
-                        Platform(x*32, y*32, self.platforms)
+            for _ in range(pacer.advance(clock.get_rawtime())):
+                pacer.remember(all_sprites)
+                all_sprites.update()
             
-            self.player = Player(100, 100, self.platforms)
-            self.all_sprites.add(self.player)
+            screen.fill((135, 206, 235))
+            platforms.draw(screen)
+            with pacer.interpolated(all_sprites):
+                all_sprites.draw(screen)
+            pygame.display.flip()
+            if diagnostics:
+                diagnostics.tick()
+            clock.tick(RENDER_FPS)
+    except (EOFError, OSError):
+        pass
+    finally:
+        pygame.quit()
+
+class PygameSimulator:
+    """Long-lived simulator subprocess that keeps its window between levels.
+
+    SDL runs in its own process rather than next to the Tk mainloop, and
+    ``load`` only sends the new level down a pipe, so the window is never
+    torn down. If the window was closed, the next ``load`` starts it again.
+    """
+    def __init__(self):
+        self.context = multiprocessing.get_context("spawn")
+        self.process = None
+        self.conn = None
+        
+    def start(self):
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=run_simulator, args=(child_conn,), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        
+    def load(self, level_data):
+        if not self.process or not self.process.is_alive():
+            self.start()
+        try:
+            self.conn.send(("level", level_data))
+        except (BrokenPipeError, OSError):
+            # The window closed between the check and the send
+            self.start()
+            self.conn.send(("level", level_data))
             
-            while self.running:
-                self.screen.fill((135, 206, 235))
-                for event in pygame.event.get():
-                    if event.type == QUIT:
-                        self.running = False
-                
-                self.all_sprites.update()
-                self.platforms.draw(self.screen)
-                self.all_sprites.draw(self.screen)
-                pygame.display.flip()
-                self.clock.tick(30)
-                
-        except Exception as e:
-            self.daught_exception = e
-        finally:
-            pygame.quit()
+    def close(self):
+        if self.process and self.process.is_alive():
+            try:
+                self.conn.send(("quit", None))
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=1)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.process = None
 
 class Player(pygame.sprite.Sprite):
     def __init__(self, x, y, platforms):
@@ -121,14 +259,15 @@ class Player(pygame.sprite.Sprite):
         
     def update(self):
         keys = pygame.key.get_pressed()
-        self.velocity.x = (keys[K_RIGHT] - keys[K_LEFT]) * 5
+        self.velocity.x = (keys[K_RIGHT] - keys[K_LEFT]) * PLAYER_SPEED
         if keys[K_SPACE] and self.on_ground:
-            self.velocity.y = -15
+            self.velocity.y = JUMP_FORCE
             
-        self.velocity.y += 0.8
+        self.velocity.y += GRAVITY
         self.rect.x += self.velocity.x
         self.collide('x')
         self.rect.y += self.velocity.y
+        self.on_ground = False
         self.collide('y')
         
     def collide(self, axis):
@@ -146,12 +285,26 @@ class Player(pygame.sprite.Sprite):
                     self.velocity.y = 0
                 elif self.velocity.y < 0:
                     self.rect.top = platform.rect.bottom
+                    self.velocity.y = 0
+
+class Platform(pygame.sprite.Sprite):
+    shared_image = None  # one surface for every platform
+    
+    def __init__(self, x, y, group):
+        super().__init__(group)
+        if Platform.shared_image is None:
+            Platform.shared_image = pygame.Surface((32,32))
+            Platform.shared_image.fill((101,67,33))
+        self.image = Platform.shared_image
+        self.rect = self.image.get_rect(topleft=(x,y))
 
 class MarioGPTApp:
     def __init__(self, root):
         self.root = root
-        self.generator = MarioGPT()
-        self.simulator = None
+        diagnostics = MemoryDiagnostics("M-GPT generator") if MEMDIAG else None
+        self.generator = MarioGPT(LevelStore(), diagnostics)
+        self.simulator = PygameSimulator()
+        self.job = None
         
         self.setup_ui()
         
@@ -162,24 +315,102 @@ class MarioGPTApp:
         self.prompt_entry = ttk.Entry(main_frame, width=50)
         self.prompt_entry.pack(pady=10)
         
-        generate_btn = ttk.Button(
-            main_frame,
+        options_frame = ttk.Frame(main_frame)
+        options_frame.pack()
+        
+        ttk.Label(options_frame, text="Generations").pack(side=tk.LEFT)
+        self.generations = tk.IntVar(value=50)
+        ttk.Spinbox(
+            options_frame,
+            from_=1,
+            to=100000,
+            width=8,
+            textvariable=self.generations
+        ).pack(side=tk.LEFT, padx=5)
+        
+        self.generate_btn = ttk.Button(
+            options_frame,
             text="Generate and Simulate",
             command=self.generate_and_simulate
         )
-        generate_btn.pack()
+        self.generate_btn.pack(side=tk.LEFT)
+        
+        self.cancel_btn = ttk.Button(
+            options_frame,
+            text="Cancel",
+            command=self.cancel_generation,
+            state=tk.DISABLED
+        )
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.progress = ttk.Progressbar(main_frame, length=300)
+        self.progress.pack(pady=5)
+        
+        self.status = ttk.Label(main_frame, text="")
+        self.status.pack()
+        
+        # Best level so far, updated while generation runs
+        self.best_label = ttk.Label(main_frame, text="", font=("Courier", 12))
+        self.best_label.pack(pady=5)
         
     def generate_and_simulate(self):
-        level = self.generator.generate_level(self.prompt_entry.get())
+        prompt = self.prompt_entry.get()
+        try:
+            generations = max(1, self.generations.get())
+        except tk.TclError:
+            generations = 1
+        
+        def work(job):
+            def progress(done, total, best):
+                job.check()
+                job.report(done, total, best)
+            return self.generator.generate_level(prompt, generations, progress)
         
-        if self.simulator:
-            self.simulator.running = False
-            self.simulator.join()
+        self.generate_btn.config(state=tk.DISABLED)
+        self.cancel_btn.config(state=tk.NORMAL)
+        self.progress.config(maximum=generations, value=0)
+        self.status.config(text="Generating...")
+        self.job = BackgroundJob(
+            self.root,
+            work,
+            on_progress=self.show_progress,
+            on_done=self.simulate,
+            on_error=self.show_error,
+            on_finish=self.generation_finished
+        ).start()
+        
+    def cancel_generation(self):
+        if self.job:
+            self.job.cancel()
+            self.status.config(text="Cancelling...")
             
-        self.simulator = PygameSimulator(level)
-        self.simulator.start()
+    def generation_finished(self):
+        if self.job.cancelled:
+            self.status.config(text="Cancelled")
+        self.job = None
+        self.generate_btn.config(state=tk.NORMAL)
+        self.cancel_btn.config(state=tk.DISABLED)
+        
+    def show_progress(self, done, total, best):
+        self.progress.config(value=done)
+        self.status.config(text=f"Generation {done}/{total}")
+        self.best_label.config(text=best)
+        
+    def show_error(self, exc):
+        self.status.config(text=f"Generation failed: {exc}")
+        
+    def simulate(self, level):
+        self.status.config(text="Done")
+        self.simulator.load(level)
+        
+    def close(self):
+        if self.job:
+            self.job.cancel()
+        self.simulator.close()
+        self.root.destroy()
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = MarioGPTApp(root)
+    root.protocol("WM_DELETE_WINDOW", app.close)
     root.mainloop()
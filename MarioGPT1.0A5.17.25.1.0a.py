@@ -2,16 +2,14 @@ import pygame
 import sys
 import random
 
+from physics import ENEMY_SPEED, GRAVITY, JUMP_FORCE, PLAYER_SPEED, TILE_SIZE
+
 # Initialize Pygame
 pygame.init()
 
 # Game constants
 WIDTH, HEIGHT = 800, 600
 FPS = 60
-TILE_SIZE = 32
-PLAYER_SPEED = 5
-GRAVITY = 0.4
-JUMP_FORCE = -9
 
 # Colors
 SKY_BLUE = (135, 206, 235)
@@ -109,7 +107,7 @@ class Enemy(pygame.sprite.Sprite):
         self.direction = 1
 
     def update(self):
-        self.rect.x += self.direction * 2
+        self.rect.x += self.direction * ENEMY_SPEED
         if random.random() < 0.01:
             self.direction *= -1
 
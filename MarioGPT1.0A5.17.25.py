@@ -3,6 +3,11 @@ from tkinter import ttk
 import random
 import json
 
+import level_format
+from level_loader import save_json
+from level_model import ColumnModel
+from tk_worker import BackgroundJob
+
 class MarioDataset:
     """Simulated Mario 1 level structure patterns"""
     def __init__(self):
@@ -23,6 +28,11 @@ class MarioGPT:
     def __init__(self):
         self.dataset = MarioDataset()
         self.model = self._build_model()
+        # n-gram column model trained on the patterns above, per prompt tag
+        self.column_model = ColumnModel(order=4).fit(
+            list(self.model.values()),
+            [[tag] for tag in self.model]
+        )
         
     def _build_model(self):
         # Simulated "trained" patterns
@@ -33,41 +43,87 @@ class MarioGPT:
             'mixed': ['GG--||GGPP--||GG' * 4]
         }
     
-    def generate_level(self, prompt):
-        prompt = prompt.lower()
-        if 'flat' in prompt:
-            return self.model['flat']
-        elif 'platform' in prompt:
-            return self.model['platforms']
-        elif 'pipe' in prompt:
-            return self.model['pipes']
-        return random.choice(list(self.model.values()))
+    def generate_level(self, prompt, width=48):
+        return self.column_model.generate(width, prompt)
 
 class LevelVisualizer(tk.Canvas):
+    """Tile canvas that redraws only the tiles that changed.
+
+    One rectangle item is kept per tile. A new level is diffed against the
+    previous grid: changed tiles are recoloured, extra tiles created and
+    missing ones deleted. Zoom rescales the existing items and scrolling
+    uses the canvas scroll region, so neither redraws the level.
+    """
     def __init__(self, master, width=800, height=300):
         super().__init__(master, width=width, height=height)
         self.tile_size = 32
+        self.zoom = 1.0
         self.colors = {
             'G': '#654321',  # Ground
             'P': '#00ff00',  # Platform
             '|': '#0000ff',  # Pipe
             '-': '#87ceeb'   # Sky
         }
+        self.tiles = {}  # (x, y) -> [char, canvas item]
+        self.level_size = (0, 0)
+        
+        self.bind("<MouseWheel>", self.on_wheel)
+        self.bind("<Shift-MouseWheel>", self.on_wheel)
+        self.bind("<Control-MouseWheel>", self.on_zoom_wheel)
+        # X11 reports the wheel as buttons 4 and 5
+        self.bind("<Button-4>", lambda e: self.xview_scroll(-2, "units"))
+        self.bind("<Button-5>", lambda e: self.xview_scroll(2, "units"))
+        self.bind("<Control-Button-4>", lambda e: self.zoom_by(1.25))
+        self.bind("<Control-Button-5>", lambda e: self.zoom_by(0.8))
         
     def draw_level(self, level_str):
-        self.delete("all")
         rows = level_str.split('\n')
+        size = self.tile_size * self.zoom
+        seen = set()
         for y, row in enumerate(rows):
             for x, char in enumerate(row):
-                color = self.colors.get(char, '#ffffff')
-                self.create_rectangle(
-                    x * self.tile_size,
-                    y * self.tile_size,
-                    (x+1) * self.tile_size,
-                    (y+1) * self.tile_size,
-                    fill=color,
+                seen.add((x, y))
+                tile = self.tiles.get((x, y))
+                if tile is not None:
+                    if tile[0] != char:
+                        self.itemconfigure(tile[1], fill=self.colors.get(char, '#ffffff'))
+                        tile[0] = char
+                    continue
+                item = self.create_rectangle(
+                    x * size,
+                    y * size,
+                    (x+1) * size,
+                    (y+1) * size,
+                    fill=self.colors.get(char, '#ffffff'),
                     outline=""
                 )
+                self.tiles[(x, y)] = [char, item]
+        
+        for cell in [cell for cell in self.tiles if cell not in seen]:
+            self.delete(self.tiles.pop(cell)[1])
+        
+        width = max((len(row) for row in rows), default=0)
+        self.level_size = (width, len(rows))
+        self.update_scrollregion()
+        
+    def update_scrollregion(self):
+        size = self.tile_size * self.zoom
+        width, height = self.level_size
+        self.configure(scrollregion=(0, 0, width * size, height * size))
+        
+    def zoom_by(self, factor):
+        zoom = min(4.0, max(0.125, self.zoom * factor))
+        if zoom == self.zoom:
+            return
+        self.scale("all", 0, 0, zoom / self.zoom, zoom / self.zoom)
+        self.zoom = zoom
+        self.update_scrollregion()
+        
+    def on_wheel(self, event):
+        self.xview_scroll(-1 if event.delta > 0 else 1, "units")
+        
+    def on_zoom_wheel(self, event):
+        self.zoom_by(1.25 if event.delta > 0 else 0.8)
 
 class MarioGPTApp:
     def __init__(self, root):
@@ -75,7 +131,8 @@ class MarioGPTApp:
         self.root.title("MarioGPT Text2Level")
         
         self.generator = MarioGPT()
-        self.level_code = ""
+        self.levels = []
+        self.prompts = []
         
         self.create_widgets()
         
@@ -87,73 +144,64 @@ class MarioGPTApp:
         self.prompt_entry = ttk.Entry(input_frame, width=50)
         self.prompt_entry.pack(side=tk.LEFT, padx=5)
         
-        generate_btn = ttk.Button(
+        self.generate_btn = ttk.Button(
             input_frame,
             text="Generate Level",
             command=self.generate_level
         )
-        generate_btn.pack(side=tk.LEFT)
+        self.generate_btn.pack(side=tk.LEFT)
         
         # Visualization
         self.visualizer = LevelVisualizer(self.root)
-        self.visualizer.pack(pady=10)
+        self.visualizer.pack(pady=(10, 0))
+        
+        scrollbar = ttk.Scrollbar(
+            self.root,
+            orient=tk.HORIZONTAL,
+            command=self.visualizer.xview
+        )
+        scrollbar.pack(fill=tk.X, pady=(0, 10))
+        self.visualizer.configure(xscrollcommand=scrollbar.set)
         
-        # Code Output
-        code_frame = ttk.Frame(self.root)
-        code_frame.pack(fill=tk.BOTH, expand=True)
+        # Level Data Output
+        data_frame = ttk.Frame(self.root)
+        data_frame.pack(fill=tk.BOTH, expand=True)
         
-        self.code_text = tk.Text(code_frame, height=10)
-        self.code_text.pack(fill=tk.BOTH, expand=True)
+        self.data_text = tk.Text(data_frame, height=10)
+        self.data_text.pack(fill=tk.BOTH, expand=True)
         
         save_btn = ttk.Button(
             self.root,
-            text="Export Python Code",
-            command=self.export_code
+            text="Export Levels",
+            command=self.export_levels
         )
         save_btn.pack(pady=5)
         
     def generate_level(self):
         prompt = self.prompt_entry.get()
-        level_data = self.generator.generate_level(prompt)
+        self.generate_btn.config(state=tk.DISABLED)
+        BackgroundJob(
+            self.root,
+            lambda job: self.generator.generate_level(prompt),
+            on_done=lambda level_data: self.show_level(prompt, level_data),
+            on_finish=lambda: self.generate_btn.config(state=tk.NORMAL)
+        ).start()
+        
+    def show_level(self, prompt, level_data):
+        self.levels.append(level_data)
+        self.prompts.append(prompt)
         self.visualizer.draw_level('\n'.join(level_data))
-        self.generate_python_code(level_data)
-        
-    def generate_python_code(self, level_data):
-        code = [
-            "import pygame\n",
-            "class Level:",
-            "    def __init__(self):",
-            "        self.tiles = ["
-        ]
-        
-        for row in level_data:
-            code.append(f'            "{row}",')
-        
-        code += [
-            "        ]",
-            "        self.tile_size = 32",
-            "",
-            "    def create_platforms(self, group):",
-            "        for y, row in enumerate(self.tiles):",
-            "            for x, tile in enumerate(row):",
-            "                if tile == 'G':",
-            "                    Platform(x*32, y*32, group)",
-            "",
-            "class Platform(pygame.sprite.Sprite):",
-            "    def __init__(self, x, y, group):",
-            "        super().__init__(group)",
-            "        self.image = pygame.Surface((32,32))",
-            "        self.image.fill('#654321')",
-            "        self.rect = self.image.get_rect(topleft=(x,y))"
-        ]
-        
-        self.level_code = '\n'.join(code)
-        self.code_text.delete(1.0, tk.END)
-        self.code_text.insert(tk.END, self.level_code)
-        
-    def export_code(self):
-        with open("generated_level.py", "w") as f:
-            f.write(self.level_code)
+        self.show_level_data(level_data)
+        
+    def show_level_data(self, level_data):
+        self.data_text.delete(1.0, tk.END)
+        self.data_text.insert(tk.END, json.dumps({"tiles": level_data}, indent=2))
+        
+    def export_levels(self):
+        # Plain level data for every level generated this session; smb4k
+        # plays either file when it is copied into levels/
+        save_json("generated_levels.json", self.levels, self.prompts)
+        level_format.write_archive("generated_levels.smba", self.levels)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -2,17 +2,19 @@ import pygame
 import sys
 import random
 
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init()
+from collision_mesh import LevelMesh
+from dirty_render import DIRTY_RECTS, DirtyRenderer
+from frame_pacing import FixedStep
+from memdiag import MEMDIAG, MemoryDiagnostics
+from physics import ENEMY_SPEED, GRAVITY, JUMP_FORCE, PLAYER_SPEED, TILE_SIZE
+from level_repair import repair_level
+from level_store import LevelStore
+from pickups import PickupGrid, Stats
+from runtime import first_frame, init_pygame
 
 # Game constants
 WIDTH, HEIGHT = 800, 600
 FPS = 60
-TILE_SIZE = 32
-PLAYER_SPEED = 5
-GRAVITY = 0.4
-JUMP_FORCE = -9
 
 # Colors
 SKY_BLUE = (135, 206, 235)
@@ -23,9 +25,10 @@ YELLOW = (255, 255, 0)
 WHITE = (255, 255, 255)
 GREEN = (0, 255, 0)
 
-class Player(pygame.sprite.Sprite):
+class Player(pygame.sprite.DirtySprite):
     def __init__(self):
         super().__init__()
+        self.dirty = 2  # Moves every frame
         self.image = pygame.Surface((TILE_SIZE, TILE_SIZE))
         self.image.fill(RED)
         self.rect = self.image.get_rect()
@@ -72,35 +75,37 @@ class Player(pygame.sprite.Sprite):
                 elif self.velocity.x < 0:
                     self.rect.left = platform.rect.right
 
-class Block(pygame.sprite.Sprite):
-    def __init__(self, x, y):
+class Block(pygame.sprite.DirtySprite):
+    # One merged run of solid tiles, drawn with its autotiled image
+    def __init__(self, rect, image):
         super().__init__()
-        self.image = pygame.Surface((TILE_SIZE, TILE_SIZE))
-        self.image.fill(BROWN)
-        self.rect = self.image.get_rect(topleft=(x, y))
+        self.image = image
+        self.rect = rect
 
-class Coin(pygame.sprite.Sprite):
+class Coin(pygame.sprite.DirtySprite):
     def __init__(self, x, y):
         super().__init__()
         self.image = pygame.Surface((TILE_SIZE//2, TILE_SIZE//2))
         self.image.fill(YELLOW)
         self.rect = self.image.get_rect(center=(x + TILE_SIZE//2, y + TILE_SIZE//2))
 
-class Enemy(pygame.sprite.Sprite):
+class Enemy(pygame.sprite.DirtySprite):
     def __init__(self, x, y):
         super().__init__()
+        self.dirty = 2  # Moves every frame
         self.image = pygame.Surface((TILE_SIZE, TILE_SIZE))
         self.image.fill(GREEN)
         self.rect = self.image.get_rect(topleft=(x, y))
         self.direction = 1
 
     def update(self):
-        self.rect.x += self.direction * 2
+        self.rect.x += self.direction * ENEMY_SPEED
         if random.random() < 0.01:  # Random direction changes
             self.direction *= -1
 
 class Overworld:
     def __init__(self):
+        self.drawn_node = None
         self.level_nodes = [
             (100, 100),
             (300, 150),
@@ -111,6 +116,7 @@ class Overworld:
         self.current_node = 0
 
     def draw(self, screen):
+        self.drawn_node = self.current_node
         screen.fill(SKY_BLUE)
         
         # Draw paths
@@ -136,55 +142,72 @@ def generate_smw_level():
     
     # Add random platforms
     for _ in range(random.randint(3, 6)):
-        x = random.randint(0, (WIDTH // TILE_SIZE) - 4)
-        y = random.randint(height // 2, height - 2)
         length = random.randint(2, 5)
+        x = random.randint(0, (WIDTH // TILE_SIZE) - length)
+        y = random.randint(height // 2, height - 2)
         for i in range(length):
             level[y][x + i] = "B"
     
-    # Add random coins
-    for _ in range(random.randint(5, 15)):
-        x = random.randint(0, (WIDTH // TILE_SIZE) - 1)
-        y = random.randint(0, height - 2)
-        if level[y][x] == " ":
-            level[y][x] = "C"
-    
     # Add random pipes
     for _ in range(random.randint(2, 4)):
         x = random.randint(5, (WIDTH // TILE_SIZE) - 4)
-        height = random.randint(2, 4)
-        for y in range(1, height + 1):
+        pipe_height = random.randint(2, 4)
+        for y in range(1, pipe_height + 1):
             level[-y][x] = "B"
             level[-y][x + 1] = "B"
     
-    return level
+    # Add random coins, after the pipes so none is stamped over
+    for _ in range(random.randint(5, 15)):
+        x = random.randint(0, (WIDTH // TILE_SIZE) - 1)
+        y = random.randint(0, height - 2)
+        if level[y][x] == " ":
+            level[y][x] = "C"
+    
+    # Keep the spawn clear and every step and gap jumpable
+    return repair_level(level)
 
 def create_level(level_layout):
     platforms = pygame.sprite.Group()
     coins = pygame.sprite.Group()
+    pickups = PickupGrid(TILE_SIZE)
     enemies = pygame.sprite.Group()
     
+    for rect, image in LevelMesh(level_layout, {'B': BROWN}, TILE_SIZE, solid='B').pieces:
+        platforms.add(Block(rect, image))
+    
     for y, row in enumerate(level_layout):
         for x, tile in enumerate(row):
-            if tile == 'B':
-                platforms.add(Block(x * TILE_SIZE, y * TILE_SIZE))
-            elif tile == 'C':
-                coins.add(Coin(x * TILE_SIZE, y * TILE_SIZE))
+            if tile == 'C':
+                coin = Coin(x * TILE_SIZE, y * TILE_SIZE)
+                coins.add(coin)
+                pickups.add(coin, x, y)
             elif tile == 'E':
                 enemies.add(Enemy(x * TILE_SIZE, y * TILE_SIZE))
     
-    return platforms, coins, enemies
+    return platforms, coins, enemies, pickups
 
 def main():
+    init_pygame()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     clock = pygame.time.Clock()
     
     overworld = Overworld()
+    stats = Stats()
+    store = LevelStore()
+    pygame.display.set_caption(stats.summary())
+    # Also used when adaptive pacing needs cheaper frames
+    renderer = DirtyRenderer(screen, SKY_BLUE)
+    drawing_dirty = DIRTY_RECTS
+    pacer = FixedStep(FPS)
+    diagnostics = MemoryDiagnostics("V05") if MEMDIAG else None
+    if diagnostics:
+        diagnostics.watch('stored levels', lambda: len(store))
     game_state = "overworld"  # overworld | level | game_over
     
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                store.close()
                 pygame.quit()
                 sys.exit()
                 
@@ -197,36 +220,71 @@ def main():
                     if event.key == pygame.K_RETURN:
                         game_state = "level"
                         level_layout = generate_smw_level()
-                        platforms, coins, enemies = create_level(level_layout)
+                        store.add_later(level_layout, 'smw')
+                        platforms, coins, enemies, pickups = create_level(level_layout)
                         player = Player()
                         player.rect.topleft = (100, HEIGHT - 150)
+                        overworld.drawn_node = None
+                        renderer.set_scene(platforms, coins, enemies, player)
+                        pacer.reset()
         
         if game_state == "level":
-            player.update(platforms)
-            enemies.update()
-            
-            # Check coin collection
-            coins_collected = pygame.sprite.spritecollide(player, coins, True)
-            
-            # Check enemy collision
-            if pygame.sprite.spritecollide(player, enemies, False):
-                game_state = "overworld"
+            # Physics runs at a fixed rate however long frames take
+            for _ in range(pacer.advance(clock.get_rawtime())):
+                pacer.remember(player, enemies)
+                player.update(platforms)
+                enemies.update()
+                
+                # Check coin collection
+                coins_collected = pickups.collect(player.rect)
+                if coins_collected:
+                    stats.record('coin', len(coins_collected))
+                    pygame.display.set_caption(stats.summary())
+                
+                # Check enemy collision
+                if pygame.sprite.spritecollide(player, enemies, False):
+                    game_state = "overworld"
+                    break
+                
+                # Return to overworld when reaching end
+                if player.rect.x >= WIDTH - TILE_SIZE:
+                    stats.record('level')
+                    pygame.display.set_caption(stats.summary())
+                    game_state = "overworld"
+                    break
+        
+        # A step may have left the level; then this frame shows the map
+        if game_state == "level":
+            # Under load, repaint only what moved rather than the whole scene
+            if drawing_dirty != (DIRTY_RECTS or pacer.degraded):
+                drawing_dirty = not drawing_dirty
+                renderer.invalidate()
             
             # Draw level
-            screen.fill(SKY_BLUE)
-            platforms.draw(screen)
-            coins.draw(screen)
-            enemies.draw(screen)
-            screen.blit(player.image, player.rect)
-            
-            # Return to overworld when reaching end
-            if player.rect.x >= WIDTH - TILE_SIZE:
-                game_state = "overworld"
+            with pacer.interpolated(player, enemies):
+                if drawing_dirty:
+                    renderer.draw()
+                else:
+                    screen.fill(SKY_BLUE)
+                    platforms.draw(screen)
+                    coins.draw(screen)
+                    enemies.draw(screen)
+                    screen.blit(player.image, player.rect)
         
         elif game_state == "overworld":
+            # The dirty-rect mode leaves an unchanged map on screen
+            if DIRTY_RECTS and overworld.drawn_node == overworld.current_node:
+                if diagnostics:
+                    diagnostics.tick()
+                clock.tick(FPS)
+                continue
             overworld.draw(screen)
         
-        pygame.display.flip()
+        if game_state == "overworld" or not drawing_dirty:
+            pygame.display.flip()
+        first_frame()
+        if diagnostics:
+            diagnostics.tick()
         clock.tick(FPS)
 
 if __name__ == "__main__":
@@ -1,17 +1,14 @@
 import pygame
 import sys
 import random
+from collections import deque
 
-# Initialize Pygame
-pygame.init()
+from physics import ENEMY_SPEED, GRAVITY, JUMP_FORCE, PLAYER_SPEED, TILE_SIZE
+from runtime import first_frame, init_pygame
 
 # Game constants
 WIDTH, HEIGHT = 800, 600
 FPS = 60
-TILE_SIZE = 32
-PLAYER_SPEED = 5
-GRAVITY = 0.4
-JUMP_FORCE = -9
 
 # Colors
 SKY_BLUE = (135, 206, 235)
@@ -20,25 +17,92 @@ PLAYER_COLOR = (255, 0, 0)
 PLATFORM_COLOR = (34, 139, 34)
 ENEMY_COLOR = (0, 255, 0)
 
+# Chunk rows: platforms and enemies sit one tile above the ground row's top
+GROUND_Y = HEIGHT - TILE_SIZE
+PLATFORM_Y = HEIGHT - TILE_SIZE * 3
+CHUNK_TOP = PLATFORM_Y
+
+class AliasSampler:
+    """Weighted choice in O(1) per draw using Vose's alias method."""
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        scaled = [w * n / total for w in weights]
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+        small = [i for i, w in enumerate(scaled) if w < 1.0]
+        large = [i for i, w in enumerate(scaled) if w >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self):
+        i = random.randrange(len(self.prob))
+        return i if random.random() < self.prob[i] else self.alias[i]
+
+class ChunkTemplate:
+    """One pattern compiled into ready-to-place collision and render data.
+
+    ``colliders`` merges each run of solid tiles in a row into one rect and
+    ``image`` has the chunk's blocks pre-drawn, both relative to the chunk's
+    left edge, so placing a chunk is an offset rather than per-tile work.
+    """
+    def __init__(self, tiles):
+        self.tiles = tuple(tiles)
+        self.width = len(self.tiles) * TILE_SIZE
+        self.colliders = []
+        self.enemies = []
+        self.image = pygame.Surface((self.width, HEIGHT - CHUNK_TOP), pygame.SRCALPHA)
+        
+        runs = {}  # tile -> [start, end) of the current run
+        for x, tile in enumerate(self.tiles + (None,)):
+            for kind in list(runs):
+                if kind != tile:
+                    start, end = runs.pop(kind)
+                    self._add_run(kind, start, end)
+            if tile in ('G', 'P'):
+                runs.setdefault(tile, [x, x])[1] = x + 1
+            elif tile == 'E':
+                self.enemies.append((x * TILE_SIZE, PLATFORM_Y))
+
+    def _add_run(self, tile, start, end):
+        y, color = (GROUND_Y, GROUND_COLOR) if tile == 'G' else (PLATFORM_Y, PLATFORM_COLOR)
+        rect = pygame.Rect(start * TILE_SIZE, y, (end - start) * TILE_SIZE, TILE_SIZE)
+        self.colliders.append(rect)
+        self.image.fill(color, rect.move(0, -CHUNK_TOP))
+
+    def place(self, x):
+        return [rect.move(x, 0) for rect in self.colliders]
+
 class LevelGenerator:
-    def __init__(self):
+    def __init__(self, weights=None):
         self.patterns = [
             self._create_platform,
             self._create_pit,
             self._create_stairs,
             self._create_enemy
         ]
+        # Each pattern only ever produces one chunk, so build them all once
+        self.templates = [ChunkTemplate(self._build_chunk(p)) for p in self.patterns]
+        self.sampler = AliasSampler(weights or [1] * len(self.patterns))
         
-    def generate_chunk(self):
+    def _build_chunk(self, pattern):
         chunk = []
         # Base ground
         chunk.extend(['G'] * 10)
-        
-        # Random pattern
-        pattern = random.choice(self.patterns)
         pattern(chunk)
-        
         return chunk
+        
+    def sample_template(self):
+        return self.templates[self.sampler.sample()]
+        
+    def generate_chunk(self):
+        return list(self.sample_template().tiles)
     
     def _create_platform(self, chunk):
         chunk[4:7] = ['P'] * 3
@@ -54,6 +118,11 @@ class LevelGenerator:
     def _create_enemy(self, chunk):
         chunk[5] = 'E'
 
+class Collider(pygame.sprite.Sprite):
+    def __init__(self, rect):
+        super().__init__()
+        self.rect = rect
+
 class Player(pygame.sprite.Sprite):
     def __init__(self):
         super().__init__()
@@ -93,13 +162,6 @@ class Player(pygame.sprite.Sprite):
 
         self.rect.x += self.velocity.x
 
-class Block(pygame.sprite.Sprite):
-    def __init__(self, x, y, color):
-        super().__init__()
-        self.image = pygame.Surface((TILE_SIZE, TILE_SIZE))
-        self.image.fill(color)
-        self.rect = self.image.get_rect(topleft=(x, y))
-
 class Enemy(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
@@ -109,11 +171,12 @@ class Enemy(pygame.sprite.Sprite):
         self.direction = 1
 
     def update(self):
-        self.rect.x += self.direction * 2
+        self.rect.x += self.direction * ENEMY_SPEED
         if random.random() < 0.01:
             self.direction *= -1
 
 def main():
+    init_pygame()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     clock = pygame.time.Clock()
     
@@ -121,25 +184,24 @@ def main():
     all_sprites = pygame.sprite.Group()
     platforms = pygame.sprite.Group()
     enemies = pygame.sprite.Group()
+    chunks = deque()  # (x, template, sprites) of the chunks still in play
+    
+    def add_chunk(x):
+        template = generator.sample_template()
+        sprites = [Collider(rect) for rect in template.place(x)]
+        platforms.add(*sprites)
+        for ex, ey in template.enemies:
+            enemy = Enemy(x + ex, ey)
+            enemies.add(enemy)
+            all_sprites.add(enemy)
+            sprites.append(enemy)
+        chunks.append((x, template, sprites))
+        return x + template.width
     
     # Generate initial level
-    chunk_x = 0
+    level_end = 0
     for _ in range(5):
-        chunk = generator.generate_chunk()
-        for x, tile in enumerate(chunk, start=chunk_x):
-            y_pos = HEIGHT - TILE_SIZE * 2
-            if tile == 'G':
-                block = Block(x * TILE_SIZE, y_pos + TILE_SIZE, GROUND_COLOR)
-            elif tile == 'P':
-                block = Block(x * TILE_SIZE, y_pos - TILE_SIZE, PLATFORM_COLOR)
-            elif tile == 'E':
-                enemy = Enemy(x * TILE_SIZE, y_pos - TILE_SIZE)
-                enemies.add(enemy)
-                all_sprites.add(enemy)
-            if tile in ['G', 'P']:
-                platforms.add(block)
-                all_sprites.add(block)
-        chunk_x += len(chunk)
+        level_end = add_chunk(level_end)
     
     player = Player()
     all_sprites.add(player)
@@ -159,12 +221,25 @@ def main():
         # Camera follow
         camera_x = player.rect.x - WIDTH // 2
         
+        # Keep a screen of level ready ahead of the camera
+        while level_end < camera_x + WIDTH * 2:
+            level_end = add_chunk(level_end)
+        # and drop chunks a screen behind it, so the per-frame work and
+        # memory stay flat however far the player runs
+        while chunks and chunks[0][0] + chunks[0][1].width < camera_x - WIDTH:
+            for sprite in chunks.popleft()[2]:
+                sprite.kill()
+        
         # Draw
         screen.fill(SKY_BLUE)
+        for x, template, _ in chunks:
+            if x - camera_x < WIDTH and x + template.width - camera_x > 0:
+                screen.blit(template.image, (x - camera_x, CHUNK_TOP))
         for sprite in all_sprites:
             screen.blit(sprite.image, (sprite.rect.x - camera_x, sprite.rect.y))
         
         pygame.display.flip()
+        first_frame()
         clock.tick(FPS)
     
     pygame.quit()
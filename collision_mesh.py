@@ -0,0 +1,121 @@
+import pygame
+
+from physics import TILE_SIZE
+from tiles import SOLID_TILES
+
+# Autotile neighbour bits: which sides touch a tile of the same kind
+NORTH, EAST, SOUTH, WEST = 1, 2, 4, 8
+
+_variants = {}
+
+
+def _grid(rows):
+    rows = [''.join(row) for row in rows]
+    width = max((len(row) for row in rows), default=0)
+    return [row.ljust(width) for row in rows], width
+
+
+def merge_tiles(rows, solid=SOLID_TILES):
+    """Cover the solid tiles with few rectangles, as (x, y, w, h) in tiles.
+
+    Greedy meshing: each row is cut into maximal runs, and a run grows
+    downward while the row below has a run with exactly the same span.
+    Requiring the exact span keeps a full-width ground row in one piece
+    even where pipes or platforms stand on it.
+    """
+    rows, width = _grid(rows)
+    height = len(rows)
+    open_cells = [[tile in solid for tile in row] for row in rows]
+
+    def run_at(y, x, end):
+        line = open_cells[y]
+        return ((x == 0 or not line[x - 1]) and (end == width or not line[end])
+                and all(line[x:end]))
+
+    rects = []
+    for y in range(height):
+        line = open_cells[y]
+        x = 0
+        while x < width:
+            if not line[x]:
+                x += 1
+                continue
+            end = x
+            while end < width and line[end]:
+                end += 1
+            bottom = y + 1
+            while bottom < height and run_at(bottom, x, end):
+                open_cells[bottom][x:end] = [False] * (end - x)
+                bottom += 1
+            rects.append((x, y, end - x, bottom - y))
+            x = end
+    return rects
+
+
+def autotile_mask(rows, x, y):
+    """Neighbour bits for the tile at (x, y); rows must be padded."""
+    tile = rows[y][x]
+    mask = 0
+    if y > 0 and rows[y - 1][x] == tile:
+        mask |= NORTH
+    if x + 1 < len(rows[y]) and rows[y][x + 1] == tile:
+        mask |= EAST
+    if y + 1 < len(rows) and rows[y + 1][x] == tile:
+        mask |= SOUTH
+    if x > 0 and rows[y][x - 1] == tile:
+        mask |= WEST
+    return mask
+
+
+def tile_variant(color, mask, tile_size=TILE_SIZE):
+    """Tile image with a lit top and shaded sides wherever it is exposed."""
+    key = (color, mask, tile_size)
+    image = _variants.get(key)
+    if image is None:
+        image = pygame.Surface((tile_size, tile_size))
+        image.fill(color)
+        edge = max(tile_size // 8, 1)
+        light = tuple(min(c + 48, 255) for c in color)
+        dark = tuple(c * 3 // 4 for c in color)
+        if not mask & SOUTH:
+            image.fill(dark, (0, tile_size - edge, tile_size, edge))
+        if not mask & WEST:
+            image.fill(dark, (0, 0, edge, tile_size))
+        if not mask & EAST:
+            image.fill(dark, (tile_size - edge, 0, edge, tile_size))
+        if not mask & NORTH:
+            image.fill(light, (0, 0, tile_size, edge))
+        _variants[key] = image
+    return image
+
+
+class LevelMesh:
+    """Merged colliders for a layout, each with its autotiled image.
+
+    ``pieces`` pairs every merged pygame.Rect with a surface of the tiles it
+    covers, drawn with their autotile variants, so the level needs one
+    sprite per rectangle rather than one per tile. ``colors`` maps tile
+    characters to fill colours; solid tiles without one are not drawn.
+    """
+    def __init__(self, rows, colors, tile_size=TILE_SIZE, solid=SOLID_TILES):
+        self.rows, self.width = _grid(rows)
+        self.tile_size = tile_size
+        self.pieces = []
+        for x, y, w, h in merge_tiles(self.rows, solid):
+            rect = pygame.Rect(x * tile_size, y * tile_size, w * tile_size, h * tile_size)
+            image = pygame.Surface(rect.size, pygame.SRCALPHA)
+            for ty in range(y, y + h):
+                for tx in range(x, x + w):
+                    color = colors.get(self.rows[ty][tx])
+                    if color is not None:
+                        image.blit(tile_variant(color, autotile_mask(self.rows, tx, ty), tile_size),
+                                   ((tx - x) * tile_size, (ty - y) * tile_size))
+            self.pieces.append((rect, image))
+
+    @property
+    def colliders(self):
+        return [rect for rect, _ in self.pieces]
+
+    def draw(self, surface, offset=(0, 0)):
+        for rect, image in self.pieces:
+            surface.blit(image, rect.move(offset))
@@ -0,0 +1,42 @@
+import sys
+
+import pygame
+
+# Opt in with --dirty on the command line
+DIRTY_RECTS = "--dirty" in sys.argv
+
+
+class DirtyRenderer:
+    """Draw a scene with LayeredDirty and push only the changed rects.
+
+    Sprites must be DirtySprites: moving ones with ``dirty = 2`` so they are
+    redrawn every frame, static ones with the default ``dirty = 1`` so they
+    are drawn once and then only repainted when something passes over them.
+    The first frame of a scene, or one after ``invalidate``, redraws and
+    flips the whole screen.
+    """
+    def __init__(self, screen, color):
+        self.screen = screen
+        self.background = pygame.Surface(screen.get_size())
+        self.background.fill(color)
+        self.group = pygame.sprite.LayeredDirty()
+        self.group.clear(screen, self.background)
+        self.full_redraw = True
+
+    def set_scene(self, *sprites):
+        self.group.empty()
+        self.group.add(*sprites)
+        self.full_redraw = True
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def draw(self):
+        if self.full_redraw:
+            self.screen.blit(self.background, (0, 0))
+            self.group.repaint_rect(self.screen.get_rect())
+            self.group.draw(self.screen)
+            pygame.display.flip()
+            self.full_redraw = False
+            return
+        pygame.display.update(self.group.draw(self.screen))
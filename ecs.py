@@ -0,0 +1,309 @@
+import sys
+
+import numpy as np
+import pygame
+
+from physics import ENEMY_SPEED, GRAVITY, JUMP_FORCE, PLAYER_SPEED, TILE_SIZE
+from runtime import arguments, first_frame, init_pygame
+from tiles import SOLID_TILES
+
+# Game constants
+WIDTH, HEIGHT = 800, 600
+FPS = 60
+
+# Colors
+SKY_BLUE = (135, 206, 235)
+RED = (255, 0, 0)
+BROWN = (139, 69, 19)
+YELLOW = (255, 255, 0)
+GREEN = (0, 255, 0)
+
+# Entity kinds
+PLAYER, ENEMY, COIN = 1, 2, 3
+
+# Input columns
+LEFT, RIGHT, JUMP = 0, 1, 2
+
+
+class TileMap:
+    """Static level geometry as a boolean grid, plus its pre-drawn image."""
+    def __init__(self, rows, tile_size=TILE_SIZE):
+        rows = [''.join(row) for row in rows]
+        self.tile_size = tile_size
+        self.height = len(rows)
+        self.width = max((len(row) for row in rows), default=0)
+        self.solid = np.zeros((self.height, self.width), dtype=bool)
+        for y, row in enumerate(rows):
+            for x, tile in enumerate(row):
+                self.solid[y, x] = tile in SOLID_TILES
+        self.image = None
+
+    def solid_at(self, px, py):
+        """Vectorised solid test for pixel coordinates; outside is open."""
+        cx = np.floor_divide(px, self.tile_size).astype(np.int64)
+        cy = np.floor_divide(py, self.tile_size).astype(np.int64)
+        inside = (cx >= 0) & (cx < self.width) & (cy >= 0) & (cy < self.height)
+        result = np.zeros(np.shape(px), dtype=bool)
+        result[inside] = self.solid[cy[inside], cx[inside]]
+        return result
+
+    def render(self, color=BROWN):
+        if self.image is None:
+            size = self.tile_size
+            self.image = pygame.Surface(
+                (max(self.width, 1) * size, max(self.height, 1) * size), pygame.SRCALPHA)
+            for y, x in zip(*np.nonzero(self.solid)):
+                self.image.fill(color, (x * size, y * size, size, size))
+        return self.image
+
+
+class World:
+    """Entities as rows of component arrays.
+
+    Every component is a NumPy array indexed by entity id; ``alive`` marks
+    live rows and freed ids are reused. Systems below work on whole arrays
+    at once, selecting the entities they apply to with boolean masks.
+    ``owner`` ties an entity to the player it belongs to (-1 for none), so
+    several players can share one world without meeting each other's
+    coins and enemies.
+    """
+    def __init__(self, tile_map, capacity=64):
+        self.tile_map = tile_map
+        self.capacity = 0
+        self.free = []
+        self.count = 0
+        self._grow(capacity)
+        self.score = 0
+
+    def _grow(self, capacity):
+        def extend(array, shape, dtype):
+            new = np.zeros((capacity,) + shape, dtype=dtype)
+            if array is not None:
+                new[:len(array)] = array
+            return new
+
+        get = lambda name: getattr(self, name, None)
+        self.alive = extend(get('alive'), (), bool)
+        self.kind = extend(get('kind'), (), np.uint8)
+        self.pos = extend(get('pos'), (2,), np.float64)
+        self.vel = extend(get('vel'), (2,), np.float64)
+        self.size = extend(get('size'), (2,), np.float64)
+        self.color = extend(get('color'), (3,), np.uint8)
+        self.gravity = extend(get('gravity'), (), bool)
+        self.collides = extend(get('collides'), (), bool)
+        self.on_ground = extend(get('on_ground'), (), bool)
+        self.direction = extend(get('direction'), (), np.int8)
+        self.inputs = extend(get('inputs'), (3,), bool)
+        self.owner = extend(get('owner'), (), np.int64)
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def spawn(self, kind, x, y, w, h, color, gravity=False, collides=False, direction=0,
+              owner=-1):
+        if not self.free:
+            self._grow(self.capacity * 2)
+        eid = self.free.pop()
+        self.alive[eid] = True
+        self.kind[eid] = kind
+        self.pos[eid] = (x, y)
+        self.vel[eid] = 0
+        self.size[eid] = (w, h)
+        self.color[eid] = color
+        self.gravity[eid] = gravity
+        self.collides[eid] = collides
+        self.on_ground[eid] = False
+        self.direction[eid] = direction
+        self.inputs[eid] = False
+        self.owner[eid] = owner
+        self.count += 1
+        return eid
+
+    def destroy(self, eids):
+        for eid in np.atleast_1d(eids):
+            if self.alive[eid]:
+                self.alive[eid] = False
+                self.free.append(int(eid))
+                self.count -= 1
+
+    def of_kind(self, kind):
+        return np.nonzero(self.alive & (self.kind == kind))[0]
+
+
+def spawn_player(world, x, y):
+    return world.spawn(PLAYER, x, y, TILE_SIZE, TILE_SIZE, RED,
+                       gravity=True, collides=True)
+
+
+def spawn_layout(world, rows, owner=-1):
+    """Spawn a layout's coins ('C') and enemies ('E'); returns their ids in order."""
+    size = world.tile_map.tile_size
+    half = size // 2
+    eids = []
+    for y, row in enumerate(rows):
+        for x, tile in enumerate(row):
+            if tile == 'C':
+                eids.append(world.spawn(COIN, x * size + half // 2, y * size + half // 2,
+                                        half, half, YELLOW, owner=owner))
+            elif tile == 'E':
+                eids.append(world.spawn(ENEMY, x * size, y * size, size, size,
+                                        GREEN, direction=1, owner=owner))
+    return eids
+
+
+def world_from_layout(rows, tile_size=TILE_SIZE):
+    """Build a World from a tile layout: solids, coins ('C') and enemies ('E')."""
+    world = World(TileMap(rows, tile_size))
+    spawn_layout(world, rows)
+    return world
+
+
+def input_system(world):
+    controlled = world.alive & (world.kind == PLAYER)
+    inputs = world.inputs
+    world.vel[controlled, 0] = (inputs[controlled, RIGHT].astype(np.float64)
+                                - inputs[controlled, LEFT]) * PLAYER_SPEED
+    jumping = controlled & inputs[:, JUMP] & world.on_ground
+    world.vel[jumping, 1] = JUMP_FORCE
+    world.on_ground[jumping] = False
+
+
+def patrol_system(world, rng=np.random):
+    enemies = world.alive & (world.kind == ENEMY)
+    # Random direction changes
+    flip = enemies & (rng.random_sample(world.capacity) < 0.01)
+    world.direction[flip] *= -1
+    world.pos[enemies, 0] += world.direction[enemies] * ENEMY_SPEED
+
+
+def physics_system(world):
+    """Gravity, movement and tile collision, vertical axis first."""
+    tiles = world.tile_map
+    movers = np.nonzero(world.alive & world.gravity)[0]
+    if not len(movers):
+        return
+    vel = world.vel[movers]
+    vel[:, 1] += GRAVITY
+    pos = world.pos[movers]
+    size = world.size[movers]
+    collides = world.collides[movers]
+    tile = tiles.tile_size
+
+    # Sample points along an edge: both ends plus one per tile between them
+    def edge_hits(fixed, start, length, vertical_edge):
+        steps = int(np.ceil(size.max() / tile)) + 1
+        fractions = np.linspace(0.0, 1.0, steps)
+        along = start[:, None] + fractions[None, :] * (length[:, None] - 1)
+        across = np.repeat(fixed[:, None], steps, axis=1)
+        if vertical_edge:
+            return tiles.solid_at(across, along).any(axis=1)
+        return tiles.solid_at(along, across).any(axis=1)
+
+    # Vertical
+    pos[:, 1] += vel[:, 1]
+    down = collides & (vel[:, 1] > 0)
+    up = collides & (vel[:, 1] < 0)
+    # Resting exactly on a tile counts as standing on it
+    bottom = pos[:, 1] + size[:, 1]
+    hit_down = down & edge_hits(bottom, pos[:, 0], size[:, 0], False)
+    hit_up = up & edge_hits(pos[:, 1], pos[:, 0], size[:, 0], False)
+    pos[hit_down, 1] = np.floor_divide(bottom[hit_down], tile) * tile - size[hit_down, 1]
+    pos[hit_up, 1] = (np.floor_divide(pos[hit_up, 1], tile) + 1) * tile
+    vel[hit_down | hit_up, 1] = 0
+    world.on_ground[movers] = hit_down
+
+    # Horizontal
+    pos[:, 0] += vel[:, 0]
+    right = collides & (vel[:, 0] > 0)
+    left = collides & (vel[:, 0] < 0)
+    right_edge = pos[:, 0] + size[:, 0] - 1
+    hit_right = right & edge_hits(right_edge, pos[:, 1], size[:, 1], True)
+    hit_left = left & edge_hits(pos[:, 0], pos[:, 1], size[:, 1], True)
+    pos[hit_right, 0] = np.floor_divide(right_edge[hit_right], tile) * tile - size[hit_right, 0]
+    pos[hit_left, 0] = (np.floor_divide(pos[hit_left, 0], tile) + 1) * tile
+
+    world.pos[movers] = pos
+    world.vel[movers] = vel
+
+
+def overlaps(world, eid, candidates):
+    """Candidates whose bounding boxes overlap entity ``eid``."""
+    if not len(candidates):
+        return candidates
+    x, y = world.pos[eid]
+    w, h = world.size[eid]
+    other = world.pos[candidates]
+    other_size = world.size[candidates]
+    hit = ((other[:, 0] < x + w) & (other[:, 0] + other_size[:, 0] > x)
+           & (other[:, 1] < y + h) & (other[:, 1] + other_size[:, 1] > y))
+    return candidates[hit]
+
+
+def touching_owner(world, kind):
+    """Owned entities of ``kind`` overlapping their owner, for every owner at once."""
+    eids = np.nonzero(world.alive & (world.kind == kind) & (world.owner >= 0))[0]
+    owners = world.owner[eids]
+    pos, size = world.pos[eids], world.size[eids]
+    other, other_size = world.pos[owners], world.size[owners]
+    hit = ((other[:, 0] < pos[:, 0] + size[:, 0]) & (other[:, 0] + other_size[:, 0] > pos[:, 0])
+           & (other[:, 1] < pos[:, 1] + size[:, 1]) & (other[:, 1] + other_size[:, 1] > pos[:, 1]))
+    return eids[hit]
+
+
+def pickup_system(world, player):
+    coins = overlaps(world, player, world.of_kind(COIN))
+    world.destroy(coins)
+    world.score += len(coins)
+    return len(coins)
+
+
+def contact_system(world, player):
+    return len(overlaps(world, player, world.of_kind(ENEMY))) > 0
+
+
+def step(world, player):
+    """Advance one frame; returns True if the player touched an enemy."""
+    input_system(world)
+    patrol_system(world)
+    physics_system(world)
+    pickup_system(world, player)
+    return contact_system(world, player)
+
+
+def render_system(world, screen, camera_x=0):
+    screen.blit(world.tile_map.render(), (-camera_x, 0))
+    visible = np.nonzero(world.alive)[0]
+    for eid, (x, y), (w, h) in zip(visible, world.pos[visible], world.size[visible]):
+        screen.fill(world.color[eid], (int(x) - camera_x, int(y), int(w), int(h)))
+
+
+def main(path="levels/level2.txt"):
+    init_pygame()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    clock = pygame.time.Clock()
+
+    with open(path) as f:
+        world = world_from_layout(f.read().splitlines())
+    player = spawn_player(world, 100, HEIGHT - 150)
+
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+        keys = pygame.key.get_pressed()
+        world.inputs[player] = (keys[pygame.K_LEFT], keys[pygame.K_RIGHT], keys[pygame.K_SPACE])
+        if step(world, player):
+            world.pos[player] = (100, HEIGHT - 150)
+
+        screen.fill(SKY_BLUE)
+        render_system(world, screen)
+        pygame.display.flip()
+        first_frame()
+        clock.tick(FPS)
+
+    pygame.quit()
+    sys.exit()
+
+if __name__ == "__main__":
+    main(*arguments()[:1])
@@ -0,0 +1,101 @@
+import sys
+import time
+from contextlib import contextmanager
+
+import pygame
+
+# Opt in with --adaptive on the command line
+ADAPTIVE = "--adaptive" in sys.argv
+
+# Most fixed steps run in one frame before the backlog is dropped
+MAX_STEPS = 5
+
+# Moves longer than this (respawns, level resets) are drawn without easing
+MAX_LERP = 64
+
+
+def _sprites(items):
+    for item in items:
+        if isinstance(item, pygame.sprite.Sprite):
+            yield item
+        else:
+            yield from item
+
+
+class FixedStep:
+    """Fixed-rate updates with a render rate of their own.
+
+    ``advance`` adds the wall time since the last call to an accumulator
+    and returns how many fixed steps are due. At most ``max_steps`` run in
+    one frame and the rest of the backlog is dropped, so a long stall
+    slows the game once instead of snowballing. ``alpha`` is how far the
+    present sits between the last step and the next one.
+
+    In adaptive mode ``degraded`` turns on when the frame's own work (the
+    loop passes ``clock.get_rawtime()``) takes up most of a step, and off
+    again once it falls well below. Loops then draw more cheaply, before
+    any physics steps are dropped.
+    """
+    def __init__(self, rate=60, max_steps=MAX_STEPS, adaptive=ADAPTIVE):
+        self.step = 1.0 / rate
+        self.max_steps = max_steps
+        self.adaptive = adaptive
+        self.degraded = False
+        self.work = 0.0
+        self.dropped = 0
+        self.reset()
+
+    def reset(self):
+        """Start timing afresh, e.g. when a level starts."""
+        self.accumulator = 0.0
+        self.last = time.perf_counter()
+
+    def advance(self, work_ms=None):
+        now = time.perf_counter()
+        self.accumulator += now - self.last
+        self.last = now
+        steps = int(self.accumulator / self.step)
+        if steps > self.max_steps:
+            self.dropped += steps - self.max_steps
+            steps = self.max_steps
+            self.accumulator %= self.step
+        else:
+            self.accumulator -= steps * self.step
+
+        if self.adaptive and work_ms is not None:
+            self.work += (work_ms / 1000 - self.work) * 0.1
+            if self.work > 0.8 * self.step:
+                self.degraded = True
+            elif self.work < 0.5 * self.step:
+                self.degraded = False
+        return steps
+
+    @property
+    def alpha(self):
+        return min(self.accumulator / self.step, 1.0)
+
+    def remember(self, *items):
+        """Note where sprites (or groups of them) are before a step."""
+        for sprite in _sprites(items):
+            sprite.previous = sprite.rect.topleft
+
+    @contextmanager
+    def interpolated(self, *items):
+        """Move sprites to their in-between positions while drawing."""
+        alpha = self.alpha
+        moved = []
+        for sprite in _sprites(items):
+            previous = getattr(sprite, 'previous', None)
+            if previous is None:
+                continue
+            x, y = sprite.rect.topleft
+            dx, dy = x - previous[0], y - previous[1]
+            if abs(dx) > MAX_LERP or abs(dy) > MAX_LERP:
+                continue
+            sprite.rect.topleft = (round(x - dx * (1 - alpha)), round(y - dy * (1 - alpha)))
+            moved.append((sprite, (x, y)))
+        try:
+            yield
+        finally:
+            for sprite, position in moved:
+                sprite.rect.topleft = position
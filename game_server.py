@@ -0,0 +1,293 @@
+import asyncio
+import os
+import random
+import statistics
+import struct
+import sys
+import time
+import traceback
+from collections import deque
+
+import numpy as np
+
+from ecs import (COIN, ENEMY, TileMap, World, input_system, patrol_system, physics_system,
+                 spawn_layout, spawn_player, touching_owner)
+from level_model import load_corpus
+from physics import TILE_SIZE
+from pickups import Stats
+
+# Game constants
+SPAWN = (100, 600 - 150)
+TICK_RATE = 60
+PORT = 8765
+
+# Input byte bits, sent by clients once per change (or per tick)
+LEFT, RIGHT, JUMP = 1, 2, 4
+
+# Frame flags
+HIT, CLEARED = 1, 2
+
+# Wire format (little-endian). A client opens with one byte, the level
+# index, then sends input bytes. The server answers every tick with a
+# length-prefixed frame: header, then one MOVE per entity whose position
+# changed since the last frame sent (entity 0 is the player, enemies
+# follow in layout order) and one PICKUP per coin cell collected.
+LENGTH = struct.Struct('<H')
+FRAME = struct.Struct('<IIBHH')  # tick, score, flags, moves, pickups
+MOVE = struct.Struct('<Hhh')     # entity, x, y
+PICKUP = struct.Struct('<HH')    # cell x, cell y
+
+
+class Session:
+    """One player's run through a level, kept in a World shared per level.
+
+    The player, and the coins and enemies it owns, are entities in ``world``
+    that ``step_sessions`` moves with the ECS systems for every session on
+    that level at once. ``frame`` encodes what changed since the last frame
+    that was actually sent, so a skipped frame loses nothing. Without a
+    world the session gets one of its own.
+    """
+    def __init__(self, layout, world=None):
+        self.world = World(TileMap(layout)) if world is None else world
+        self.player = spawn_player(self.world, *SPAWN)
+        owned = spawn_layout(self.world, layout, owner=self.player)
+        self.enemies = [eid for eid in owned if self.world.kind[eid] == ENEMY]
+        # Entity ids in wire order, and their positions after the last step
+        self.entities = [self.player] + self.enemies
+        self.positions = self.world.pos[self.entities].astype(np.int64).tolist()
+        self.stats = Stats()
+        self.end_x = max((len(row) for row in layout), default=0) * TILE_SIZE - TILE_SIZE
+        self.bottom = len(layout) * TILE_SIZE
+        self.inputs = 0
+        self.tick = 0
+        self.flags = 0
+        self.collected = []
+        self.sent = [None] * (1 + len(self.enemies))
+
+    def _reset(self, flag):
+        self.flags |= flag
+        self.world.pos[self.player] = SPAWN
+        self.world.vel[self.player] = 0
+
+    def close(self):
+        world = self.world
+        world.destroy(np.nonzero(world.alive & (world.owner == self.player))[0])
+        world.destroy(self.player)
+
+    def step(self):
+        step_sessions(self.world, [self])
+
+    def frame(self):
+        """Bytes for the next frame to send, including its length prefix."""
+        moves = []
+        for entity, position in enumerate(self.positions):
+            if self.sent[entity] != position:
+                self.sent[entity] = position
+                moves.append(MOVE.pack(entity, *position))
+        body = [FRAME.pack(self.tick, self.stats.score, self.flags, len(moves),
+                           len(self.collected))]
+        body += moves
+        body += [PICKUP.pack(*cell) for cell in self.collected]
+        self.flags = 0
+        self.collected = []
+        data = b''.join(body)
+        return LENGTH.pack(len(data)) + data
+
+
+def step_sessions(world, sessions):
+    """Advance every session in ``world`` by one tick: the V05 rules on the ECS."""
+    players = np.array([session.player for session in sessions], dtype=np.int64)
+    bits = np.array([session.inputs for session in sessions], dtype=np.uint8)
+    world.inputs[players] = (bits[:, None] & [LEFT, RIGHT, JUMP]) != 0
+    input_system(world)
+    patrol_system(world)
+    physics_system(world)
+
+    by_player = {session.player: session for session in sessions}
+    coins = touching_owner(world, COIN)
+    cells = (world.pos[coins] // TILE_SIZE).astype(np.int64).tolist()
+    for owner, cell in zip(world.owner[coins].tolist(), cells):
+        session = by_player[owner]
+        session.stats.record('coin')
+        session.collected.append(cell)
+    world.destroy(coins)
+    hit = set(world.owner[touching_owner(world, ENEMY)].tolist())
+
+    for session, (x, y) in zip(sessions, world.pos[players].tolist()):
+        # Falling out of the level counts as a hit, like touching an enemy
+        if y > session.bottom or session.player in hit:
+            session._reset(HIT)
+        elif x >= session.end_x:
+            session.stats.record('level')
+            session._reset(CLEARED)
+        session.tick += 1
+
+    positions = world.pos.astype(np.int64).tolist()
+    for session in sessions:
+        session.positions = [positions[eid] for eid in session.entities]
+
+
+class GameServer:
+    """Many sessions in one process, stepped together at a fixed tick.
+
+    Sessions on the same level share a World, so one asyncio loop steps
+    each level's sessions together with the ECS systems every tick and
+    writes their frames; socket reads happen between ticks. A client whose
+    socket buffer is backed up misses frames rather than queueing them,
+    and catches up with the next one it is sent.
+    """
+    def __init__(self, levels=None, tick_rate=TICK_RATE, backlog=64 * 1024):
+        self.levels = levels or load_corpus()
+        self.tick_rate = tick_rate
+        self.backlog = backlog
+        self.clients = {}  # writer -> Session
+        self.worlds = {}   # level index -> World shared by its sessions
+        self.tick_times = deque(maxlen=10000)
+        self.overruns = 0
+        self.errors = 0
+        self.sent_bytes = 0
+        self.frames = 0
+
+    async def handle(self, reader, writer):
+        try:
+            index = (await reader.readexactly(1))[0]
+        except asyncio.IncompleteReadError:
+            writer.close()
+            return
+        index %= len(self.levels)
+        world = self.worlds.get(index)
+        if world is None:
+            world = self.worlds[index] = World(TileMap(self.levels[index]))
+        session = Session(self.levels[index], world)
+        self.clients[writer] = session
+        try:
+            while data := await reader.read(64):
+                # Only the newest input state matters
+                session.inputs = data[-1]
+        except ConnectionError:
+            pass
+        finally:
+            self._drop(writer)
+
+    def _drop(self, writer):
+        session = self.clients.pop(writer, None)
+        if session is not None:
+            session.close()
+        writer.close()
+
+    def _failed(self, writers):
+        # Broken sessions are dropped; the others keep running
+        traceback.print_exc()
+        self.errors += len(writers)
+        for writer in writers:
+            self._drop(writer)
+
+    def tick(self):
+        by_world = {}
+        for writer, session in self.clients.items():
+            by_world.setdefault(id(session.world), []).append((writer, session))
+        for clients in by_world.values():
+            try:
+                step_sessions(clients[0][1].world, [session for _, session in clients])
+            except Exception:
+                self._failed([writer for writer, _ in clients])
+                continue
+            for writer, session in clients:
+                try:
+                    if writer.transport.get_write_buffer_size() < self.backlog:
+                        data = session.frame()
+                        writer.write(data)
+                        self.sent_bytes += len(data)
+                        self.frames += 1
+                except Exception:
+                    self._failed([writer])
+
+    async def run(self, host='127.0.0.1', port=PORT, ready=None):
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        if ready is not None:
+            ready.set_result(server.sockets[0].getsockname()[1])
+        interval = 1 / self.tick_rate
+        next_tick = time.perf_counter()
+        async with server:
+            while True:
+                start = time.perf_counter()
+                self.tick()
+                self.tick_times.append(time.perf_counter() - start)
+                next_tick += interval
+                delay = next_tick - time.perf_counter()
+                if delay < 0:
+                    # Too slow to keep up; drop the missed ticks
+                    self.overruns += 1
+                    next_tick = time.perf_counter()
+                    delay = 0
+                await asyncio.sleep(delay)
+
+
+async def _client(port, level, stop, rng):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(bytes([level]))
+
+    async def read_frames():
+        while True:
+            size = LENGTH.unpack(await reader.readexactly(LENGTH.size))[0]
+            await reader.readexactly(size)
+
+    frames = asyncio.create_task(read_frames())
+    inputs = 0
+    while not stop.is_set():
+        # Hold keys for a while, like a player would
+        if rng.random() < 0.05:
+            inputs = rng.choice((RIGHT, RIGHT | JUMP, LEFT, JUMP, 0))
+            writer.write(bytes([inputs]))
+        await asyncio.sleep(0.02)
+    frames.cancel()
+    writer.close()
+
+
+async def load_test(sessions=200, seconds=5.0, tick_rate=TICK_RATE):
+    """Drive ``sessions`` socket clients against a local server and report."""
+    server = GameServer(tick_rate=tick_rate)
+    ready = asyncio.get_running_loop().create_future()
+    serving = asyncio.create_task(server.run(port=0, ready=ready))
+    port = await ready
+    stop = asyncio.Event()
+    rng = random.Random(0)
+    clients = [asyncio.create_task(_client(port, i % len(server.levels), stop, rng))
+               for i in range(sessions)]
+    while len(server.clients) < sessions:
+        await asyncio.sleep(0.1)
+    server.tick_times.clear()
+    server.overruns = server.errors = server.sent_bytes = server.frames = 0
+    await asyncio.wait([serving], timeout=seconds)
+    stop.set()
+    await asyncio.gather(*clients, return_exceptions=True)
+    while server.clients and not serving.done():
+        await asyncio.sleep(0.1)
+    if serving.done():
+        # The tick loop died; any numbers from here on would be wrong
+        serving.result()
+        raise RuntimeError("the server stopped during the load test")
+    serving.cancel()
+    if server.errors:
+        raise RuntimeError(f"{server.errors} sessions failed during the load test")
+
+    times = sorted(server.tick_times)
+    mean = statistics.fmean(times)
+    p99 = times[int(len(times) * 0.99)]
+    budget = 1 / tick_rate
+    print(f"{sessions} sessions at {tick_rate} Hz for {seconds:.0f} s "
+          f"({os.cpu_count()} cores, clients in the same process)")
+    print(f"tick: mean {mean * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms, "
+          f"budget {budget * 1000:.2f} ms, overruns {server.overruns}, "
+          f"{len(times)} of {seconds * tick_rate:.0f} ticks run")
+    print(f"per session: {mean / sessions * 1e6:.1f} us/tick, "
+          f"{server.sent_bytes / max(server.frames, 1):.1f} bytes/frame")
+    print(f"sessions per core at {tick_rate} Hz: ~{budget / (mean / sessions):.0f}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "serve"
+    if command == "load":
+        asyncio.run(load_test(*map(int, sys.argv[2:4])))
+    else:
+        asyncio.run(GameServer().run(port=int(sys.argv[2]) if len(sys.argv) > 2 else PORT))
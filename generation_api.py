@@ -0,0 +1,155 @@
+import importlib.util
+import os
+import random
+import sys
+from contextlib import contextmanager
+
+import numpy as np
+
+from map_elites import level_rows
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Shared palette: tensor value i is tile PALETTE[i]; 0 (sky) is the padding
+PALETTE = " BGP|-?CE"
+PALETTE_BYTES = np.frombuffer(PALETTE.encode('latin-1'), dtype=np.uint8)
+UNKNOWN = 255
+LOOKUP = np.full(256, UNKNOWN, dtype=np.uint8)
+LOOKUP[PALETTE_BYTES] = np.arange(len(PALETTE), dtype=np.uint8)
+
+_scripts = {}
+
+
+def _script(filename):
+    """Load one of the game scripts (their names aren't importable) once."""
+    module = _scripts.get(filename)
+    if module is None:
+        name = os.path.splitext(filename)[0].replace('.', '_').replace('-', '_')
+        spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _scripts[filename] = module
+    return module
+
+
+@contextmanager
+def _seeded(rng):
+    # For generators that draw from the global random module
+    state = random.getstate()
+    random.seed(rng.getrandbits(64))
+    try:
+        yield
+    finally:
+        random.setstate(state)
+
+
+class SMWBackend:
+    """``generate_smw_level`` from MarioGPTV05; the prompt is not used."""
+    def __init__(self):
+        self.generate_level = _script("MarioGPTV05.17.25.py").generate_smw_level
+
+    def __call__(self, prompt, rng):
+        with _seeded(rng):
+            return self.generate_level()
+
+
+class EvolutionBackend:
+    """M-GPT1.0's evolutionary MarioGPT, fresh per level so seeds repeat."""
+    def __init__(self, generations=5):
+        self.model = _script("M-GPT1.0.py").MarioGPT
+        self.generations = generations
+
+    def __call__(self, prompt, rng):
+        with _seeded(rng):
+            return self.model().generate_level(prompt, self.generations)
+
+
+class ColumnBackend:
+    """The prompt-tagged column model behind MarioGPT1.0A's generator."""
+    def __init__(self, width=48):
+        self.model = _script("MarioGPT1.0A5.17.25.py").MarioGPT().column_model
+        self.width = width
+
+    def __call__(self, prompt, rng):
+        return self.model.generate(self.width, prompt, rng)
+
+
+# name -> factory; a backend is called as backend(prompt, rng) and may
+# return a level in any of the usual shapes
+BACKENDS = {
+    'smw': SMWBackend,
+    'evolve': EvolutionBackend,
+    'columns': ColumnBackend,
+}
+_backends = {}
+
+
+def register_backend(name, factory):
+    BACKENDS[name] = factory
+    _backends.pop(name, None)
+
+
+def get_backend(name):
+    backend = _backends.get(name)
+    if backend is None:
+        backend = _backends[name] = BACKENDS[name]()
+    return backend
+
+
+def to_tensor(levels, height=None, width=None):
+    """Pack levels into an (n, height, width) uint8 tensor of palette indices.
+
+    Levels are aligned to the bottom-left, so floors line up, and padded
+    with sky. Any tile outside PALETTE raises ValueError.
+    """
+    grids = []
+    for level in levels:
+        rows = level_rows(level)
+        w = max((len(row) for row in rows), default=0)
+        data = ''.join(row.ljust(w) for row in rows).encode('latin-1')
+        grids.append(LOOKUP[np.frombuffer(data, dtype=np.uint8)].reshape(len(rows), w))
+    height = height or max((g.shape[0] for g in grids), default=0)
+    width = width or max((g.shape[1] for g in grids), default=0)
+    tiles = np.zeros((len(grids), height, width), dtype=np.uint8)
+    for i, grid in enumerate(grids):
+        h, w = grid.shape
+        if h > height or w > width:
+            raise ValueError(f"level {i} is {w}x{h}, larger than {width}x{height}")
+        if (grid == UNKNOWN).any():
+            raise ValueError(f"level {i} uses tiles outside the palette {PALETTE!r}")
+        tiles[i, height - h:, :w] = grid
+    return tiles
+
+
+def from_tensor(tiles):
+    """Levels as lists of row strings, padding included."""
+    chars = PALETTE_BYTES[tiles]
+    return [[row.tobytes().decode('latin-1') for row in level] for level in chars]
+
+
+def generate(prompts, seeds=None, backend='columns', height=None, width=None):
+    """Generate one level per prompt with ``backend``; returns to_tensor's tensor.
+
+    ``seeds`` is one seed per prompt, or a single int that is counted up
+    from; the same prompt and seed give the same level. Decode the result
+    with ``from_tensor`` (e.g. for LevelStore.add_many) or render it with
+    ``thumbnails.render_tensor(tiles, PALETTE)``.
+    """
+    prompts = list(prompts)
+    if seeds is None:
+        seeds = [random.randrange(2**32) for _ in prompts]
+    elif isinstance(seeds, int):
+        seeds = range(seeds, seeds + len(prompts))
+    if len(seeds) != len(prompts):
+        raise ValueError("need one seed per prompt")
+    make = get_backend(backend)
+    levels = [make(prompt, random.Random(seed)) for prompt, seed in zip(prompts, seeds)]
+    return to_tensor(levels, height, width)
+
+
+if __name__ == "__main__":
+    name = sys.argv[1] if len(sys.argv) > 1 else 'columns'
+    batch = generate(["flat ground", "pipes everywhere", "platforms"], 0, backend=name)
+    print(f"{name}: {batch.shape} {batch.dtype}")
+    for level in from_tensor(batch):
+        print('\n'.join(row.rstrip() for row in level if row.strip()) + '\n')
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+
+from physics import GRAVITY, JUMP_FORCE, PLAYER_SPEED, TILE_SIZE
+
+# How far a fall is traced before it is considered off the level
+MAX_FALL_ROWS = 64
+# Frames between the key-hold lengths and the key-press delays traced
+HOLD_STEP = 3
+DELAY_STEP = 3
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         '.cache', 'jump_tables')
+CACHE_VERSION = 2
+
+
+def _trace_arc(physics, vy, hold_frames, direction, delay=0):
+    """Simulate one airborne arc and return the tile cells the player passes.
+
+    The direction key is held from frame ``delay`` for ``hold_frames``
+    frames. Each entry is (dx, dy, frame, descending) relative to the start
+    cell; the player is traced by its centre point, one tile wide.
+    """
+    tile, speed, gravity = physics['tile'], physics['speed'], physics['gravity']
+    x = y = 0.0
+    half = tile / 2
+    cells = []
+    last = (0, 0)
+    frame = 0
+    while True:
+        frame += 1
+        vy += gravity
+        y += vy
+        if delay < frame <= delay + hold_frames:
+            x += speed * direction
+        cx = int((x + half) // tile)
+        cy = int((y + half) // tile)
+        descending = vy > 0
+        # Fill in skipped cells so fast falls never tunnel through a tile;
+        # rising arcs clear height first, falling arcs move across first
+        while last != (cx, cy):
+            lx, ly = last
+            if ly != cy and (not descending or lx == cx):
+                ly += 1 if cy > ly else -1
+            else:
+                lx += 1 if cx > lx else -1
+            last = (lx, ly)
+            cells.append((lx, ly, frame, descending))
+        if cy > MAX_FALL_ROWS:
+            return cells
+
+
+def _jump_frames(physics):
+    # Per-frame (x, y) pixel offsets of a full-speed jump until it lands
+    vy, x, y = physics['jump'], 0.0, 0.0
+    frames = []
+    while True:
+        vy += physics['gravity']
+        y += vy
+        x += physics['speed']
+        if y >= 0:
+            frames.append((x, 0.0))
+            return frames
+        frames.append((x, y))
+
+
+def _build_trie(arcs):
+    # Arcs share long prefixes, so they are merged into a prefix tree and a
+    # blocked cell prunes every arc passing through it at once
+    root = {}
+    for arc in arcs:
+        node = root
+        for dx, dy, frame, descending in arc:
+            key = (dx, dy, descending)
+            entry = node.get(key)
+            if entry is None:
+                entry = node[key] = [frame, {}]
+            else:
+                entry[0] = min(entry[0], frame)
+            node = entry[1]
+    return root
+
+
+class JumpTables:
+    """Precomputed jump trajectories for one set of physics constants.
+
+    ``frames`` holds the per-frame pixel offsets of a full-speed jump,
+    ``apex_height``/``apex_tiles`` how high it rises and ``reach_tiles`` how
+    far it carries at the same height. ``arcs`` holds every jump and
+    walk-off arc in tile cells, for both directions, and ``tries`` the same
+    arcs merged into prefix trees for level walkers. ``can_jump`` answers
+    open-air reachability between two tiles with a set lookup.
+    """
+    def __init__(self, physics, frames, arcs):
+        self.physics = physics
+        self.frames = frames
+        self.arcs = arcs
+        self.airtime = len(frames)
+        self.apex_height = -min(y for _, y in frames)
+        self.apex_tiles = int(self.apex_height // physics['tile'])
+        self.reach_tiles = int(frames[-1][0] // physics['tile'])
+        self.tries = {kind: {d: _build_trie(a) for d, a in by_dir.items()}
+                      for kind, by_dir in arcs.items()}
+        # Every (dx, dy) a rightward jump can come down on; leftward is mirrored
+        self.landings = frozenset((dx, dy) for arc in arcs['jump'][1]
+                                  for dx, dy, _, descending in arc if descending)
+
+    @classmethod
+    def build(cls, tile=TILE_SIZE, speed=PLAYER_SPEED, gravity=GRAVITY,
+              jump=JUMP_FORCE):
+        physics = {'tile': tile, 'speed': speed, 'gravity': gravity, 'jump': jump}
+        frames = _jump_frames(physics)
+        airtime = len(frames)
+        # Holding the direction key for a varying number of frames, straight
+        # away or after rising for a while, gives the different reaches
+        holds = list(range(0, airtime + 1, HOLD_STEP)) + [MAX_FALL_ROWS * 8]
+        delays = range(0, airtime // 2 + 1, DELAY_STEP)
+        arcs = {'jump': {1: [], -1: []}, 'fall': {1: [], -1: []}}
+        for kind, vy in (('jump', jump), ('fall', 0.0)):
+            for direction in (1, -1):
+                seen = set()
+                for delay in delays:
+                    for hold in holds:
+                        arc = _trace_arc(physics, vy, hold, direction, delay)
+                        key = tuple(c[:2] for c in arc)
+                        if key not in seen:
+                            seen.add(key)
+                            arcs[kind][direction].append(arc)
+        return cls(physics, frames, arcs)
+
+    def to_dict(self):
+        return {
+            'version': CACHE_VERSION,
+            'physics': self.physics,
+            'frames': self.frames,
+            'arcs': {kind: {str(d): a for d, a in by_dir.items()}
+                     for kind, by_dir in self.arcs.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        arcs = {kind: {int(d): [[tuple(cell) for cell in arc] for arc in a]
+                       for d, a in by_dir.items()}
+                for kind, by_dir in data['arcs'].items()}
+        frames = [tuple(f) for f in data['frames']]
+        return cls(data['physics'], frames, arcs)
+
+    def can_jump(self, a, b):
+        """Whether a jump from tile ``a`` can land on tile ``b`` in open air."""
+        dx, dy = b[0] - a[0], b[1] - a[1]
+        return (abs(dx), dy) in self.landings
+
+
+def cache_key(physics):
+    """Hash of everything the tables are built from.
+
+    That is the physics, the tracing limits and this module's own source,
+    so editing the tracer invalidates old cache files without anyone
+    having to remember CACHE_VERSION.
+    """
+    inputs = {
+        'version': CACHE_VERSION,
+        'physics': physics,
+        'max_fall_rows': MAX_FALL_ROWS,
+        'hold_step': HOLD_STEP,
+        'delay_step': DELAY_STEP,
+    }
+    digest = hashlib.blake2b(json.dumps(inputs, sort_keys=True).encode(), digest_size=16)
+    with open(__file__, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_tables(tile=TILE_SIZE, speed=PLAYER_SPEED, gravity=GRAVITY,
+                jump=JUMP_FORCE, path=None):
+    """Load the tables from the cache file, or build them and write it."""
+    physics = {'tile': tile, 'speed': speed, 'gravity': gravity, 'jump': jump}
+    key = cache_key(physics)
+    if path is None:
+        path = os.path.join(CACHE_DIR, f'{key}.json')
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('key') == key:
+            return JumpTables.from_dict(data)
+    except (OSError, ValueError, KeyError):
+        pass
+    tables = JumpTables.build(**physics)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(dict(tables.to_dict(), key=key), f)
+    except OSError:
+        pass
+    return tables
+
+
+TABLES = load_tables()
+
+
+def can_jump(a, b):
+    return TABLES.can_jump(a, b)
@@ -0,0 +1,179 @@
+import mmap
+import struct
+
+# Archive layout (little-endian):
+#   header  magic 'SMBA', version u16, reserved u16, count u32, index offset u64
+#   records one packed level each, back to back
+#   index   count x u64 record offsets
+# Level record:
+#   width u16, height u16, palette size u8, bits per tile u8, reserved u16,
+#   palette (one byte per tile character), tiles packed row-major, each row
+#   padded to a whole byte
+MAGIC = b'SMBA'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIQ')
+RECORD = struct.Struct('<HHBBH')
+OFFSET = struct.Struct('<Q')
+# Largest palette and level size the record's u8 / u16 fields can hold
+MAX_PALETTE = 255
+MAX_SIDE = 65535
+
+
+def _bits_for(palette_size):
+    if palette_size <= MAX_PALETTE:
+        for bits in (1, 2, 4, 8):
+            if palette_size <= 1 << bits:
+                return bits
+    raise ValueError(f"a level can use at most {MAX_PALETTE} distinct tiles, "
+                     f"not {palette_size}")
+
+
+def pack_level(level):
+    """Pack a level (rows of single-byte tile characters) into a record."""
+    rows = [''.join(row) for row in level]
+    height = len(rows)
+    width = max((len(row) for row in rows), default=0)
+    if width > MAX_SIDE or height > MAX_SIDE:
+        raise ValueError(f"a level can be at most {MAX_SIDE} tiles on a side, "
+                         f"not {width}x{height}")
+    rows = [row.ljust(width) for row in rows]
+    palette = sorted(set(''.join(rows))) or [' ']
+    bits = _bits_for(len(palette))
+    lookup = {tile: i for i, tile in enumerate(palette)}
+    per_byte = 8 // bits
+    row_bytes = -(-width // per_byte)
+
+    out = bytearray(RECORD.pack(width, height, len(palette), bits, 0))
+    out += ''.join(palette).encode('latin-1')
+    for row in rows:
+        if bits == 8:
+            out += bytes(lookup[tile] for tile in row)
+            continue
+        packed = bytearray(row_bytes)
+        for x, tile in enumerate(row):
+            packed[x // per_byte] |= lookup[tile] << ((x % per_byte) * bits)
+        out += packed
+    return bytes(out)
+
+
+class LevelView:
+    """A packed level read in place from a bytes-like buffer.
+
+    Nothing is decoded up front: ``tile`` reads one cell straight from the
+    buffer and ``rows`` decodes the whole grid only when asked for it.
+    """
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer)
+        (self.width, self.height, palette_size,
+         self.bits, _) = RECORD.unpack_from(self.buffer)
+        start = RECORD.size
+        self.palette = bytes(self.buffer[start:start + palette_size]).decode('latin-1')
+        self.per_byte = 8 // self.bits
+        self.row_bytes = -(-self.width // self.per_byte)
+        self.tiles_offset = start + palette_size
+        self.size = self.tiles_offset + self.row_bytes * self.height
+
+    def tile(self, x, y):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise IndexError((x, y))
+        byte = self.buffer[self.tiles_offset + y * self.row_bytes + x // self.per_byte]
+        mask = (1 << self.bits) - 1
+        return self.palette[(byte >> ((x % self.per_byte) * self.bits)) & mask]
+
+    def row(self, y):
+        start = self.tiles_offset + y * self.row_bytes
+        data = self.buffer[start:start + self.row_bytes]
+        if self.bits == 8:
+            return ''.join(self.palette[i] for i in data)
+        mask = (1 << self.bits) - 1
+        tiles = []
+        for byte in data:
+            for shift in range(0, 8, self.bits):
+                tiles.append(self.palette[(byte >> shift) & mask])
+        return ''.join(tiles[:self.width])
+
+    def rows(self):
+        return [self.row(y) for y in range(self.height)]
+
+    def release(self):
+        self.buffer.release()
+
+
+def unpack_level(buffer):
+    view = LevelView(buffer)
+    rows = view.rows()
+    view.release()
+    return rows
+
+
+def write_archive(path, levels):
+    """Write an iterable of levels to ``path``; returns the level count."""
+    offsets = []
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+        for level in levels:
+            offsets.append(f.tell())
+            f.write(pack_level(level))
+        index_offset = f.tell()
+        for offset in offsets:
+            f.write(OFFSET.pack(offset))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(offsets), index_offset))
+    return len(offsets)
+
+
+class LevelArchive:
+    """Memory-mapped level archive with O(1) random access.
+
+    Opening maps the file and reads only the header; ``level(i)`` looks up
+    one index entry and returns a LevelView over the mapped pages, so
+    neither opening nor reading a level copies the archive. Views still
+    alive at ``close`` keep the mapping open until they are dropped.
+    """
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"{path} is empty, not a level archive")
+        header = HEADER.unpack_from(self.map) if len(self.map) >= HEADER.size else None
+        if header is None or header[:2] != (MAGIC, VERSION):
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} level archive")
+        self.count, self.index_offset = header[3:]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self.level(index)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.level(index)
+
+    def level(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        start, = OFFSET.unpack_from(self.map, self.index_offset + index * OFFSET.size)
+        if index + 1 < self.count:
+            end, = OFFSET.unpack_from(self.map, self.index_offset + (index + 1) * OFFSET.size)
+        else:
+            end = self.index_offset
+        return LevelView(memoryview(self.map)[start:end])
+
+    def close(self):
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,119 @@
+import json
+import os
+
+import pygame
+
+import level_format
+from collision_mesh import LevelMesh
+from physics import TILE_SIZE
+from tiles import SOLID_TILES, TILE_COLORS
+
+COIN_TILE = 'C'
+ENEMY_TILE = 'E'
+# Files load_levels reads; a .txt file holds one level, the others many
+LEVEL_EXTENSIONS = ('.txt', '.json', '.smba')
+
+
+def save_json(path, levels, prompts=None):
+    """Write levels (rows of tile characters) to a JSON file."""
+    prompts = prompts or [""] * len(levels)
+    data = {
+        "tile_size": TILE_SIZE,
+        "levels": [{"prompt": prompt, "tiles": [''.join(row) for row in level]}
+                   for prompt, level in zip(prompts, levels)],
+    }
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def load_json(path):
+    with open(path) as f:
+        data = json.load(f)
+    return [entry["tiles"] for entry in data["levels"]]
+
+
+def load_levels(path):
+    """Return the levels in a .txt level, a .json export or a binary archive."""
+    extension = os.path.splitext(path)[1]
+    if extension == ".txt":
+        with open(path) as f:
+            return [f.read().splitlines()]
+    if extension == ".json":
+        return load_json(path)
+    with level_format.LevelArchive(path) as archive:
+        return [view.rows() for view in archive]
+
+
+def file_stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class LevelFile:
+    """One level file held open for reading single levels by position.
+
+    A .smba archive stays memory-mapped, so ``count`` comes from its header
+    and ``rows`` decodes only the level asked for; .txt and .json files are
+    read whole, once. ``stamp`` is the file's (mtime, size) when opened,
+    for callers that cache instances and reopen changed files.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.stamp = file_stamp(path)
+        self.archive = self.levels = None
+        if os.path.splitext(path)[1] == ".smba":
+            self.archive = level_format.LevelArchive(path)
+            self.count = self.archive.count
+        else:
+            self.levels = load_levels(path)
+            self.count = len(self.levels)
+
+    def rows(self, position):
+        if self.archive is not None:
+            return self.archive[position].rows()
+        return [''.join(row) for row in self.levels[position]]
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+
+
+class BuiltLevel:
+    """Collision and render data for one level, ready for a game loop.
+
+    ``pieces`` pairs each merged pygame.Rect covering solid tiles with its
+    autotiled image, for loops that keep the level as sprites, and
+    ``colliders`` holds just the rects. ``coins`` has a Rect per coin and
+    ``enemy_spawns`` the top-left of each enemy. ``draw`` blits the whole
+    level from one surface, pre-drawn on first use.
+    """
+    def __init__(self, rows, tile_size=TILE_SIZE):
+        self.rows = [''.join(row) for row in rows]
+        self.tile_size = tile_size
+        self.width = max((len(row) for row in self.rows), default=0)
+        self.height = len(self.rows)
+        self.coins = []
+        self.enemy_spawns = []
+        self.surface = None
+        self.mesh = LevelMesh(self.rows, TILE_COLORS, tile_size, SOLID_TILES)
+        self.pieces = self.mesh.pieces
+        self.colliders = self.mesh.colliders
+
+        coin_size = tile_size // 2
+        for y, row in enumerate(self.rows):
+            for x, tile in enumerate(row):
+                rect = pygame.Rect(x * tile_size, y * tile_size, tile_size, tile_size)
+                if tile == COIN_TILE:
+                    coin = pygame.Rect(0, 0, coin_size, coin_size)
+                    coin.center = rect.center
+                    self.coins.append(coin)
+                elif tile == ENEMY_TILE:
+                    self.enemy_spawns.append(rect.topleft)
+
+    def draw(self, screen, offset=(0, 0)):
+        if self.surface is None:
+            size = self.tile_size
+            self.surface = pygame.Surface(
+                (max(self.width, 1) * size, max(self.height, 1) * size), pygame.SRCALPHA)
+            self.mesh.draw(self.surface)
+        screen.blit(self.surface, (-offset[0], -offset[1]))
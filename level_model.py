@@ -0,0 +1,143 @@
+import bisect
+import glob
+import os
+import random
+from array import array
+from collections import Counter, defaultdict
+
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")
+
+# Context id used before the first column of a level
+START = -1
+
+
+def level_columns(level, height):
+    """Split a level into column strings, top to bottom, padded with sky."""
+    rows = [''.join(row) for row in level]
+    width = max((len(row) for row in rows), default=0)
+    rows = [' ' * width] * (height - len(rows)) + [row.ljust(width) for row in rows]
+    return [''.join(row[x] for row in rows) for x in range(width)]
+
+
+def tag_level(level):
+    """Tags for a level worked out from its tiles, for untagged corpora."""
+    tiles = ''.join(''.join(row) for row in level)
+    tags = []
+    if '|' in tiles:
+        tags.append('pipes')
+    if 'P' in tiles:
+        tags.append('platforms')
+    if not tags:
+        tags.append('flat')
+    return tags
+
+
+class _Table:
+    """Transition counts for one tag, compiled into flat arrays.
+
+    For context length k, ``index[k]`` maps a context to a [start, end)
+    slice of ``next_ids``/``cumulative``, so sampling a column is one dict
+    lookup and one bisect.
+    """
+    def __init__(self, counts, order):
+        self.index = []
+        self.next_ids = array('l')
+        self.cumulative = array('d')
+        for k in range(order):
+            index = {}
+            for context, counter in counts[k].items():
+                start = len(self.next_ids)
+                total = 0
+                for column_id, count in counter.items():
+                    total += count
+                    self.next_ids.append(column_id)
+                    self.cumulative.append(total)
+                index[context] = (start, len(self.next_ids))
+            self.index.append(index)
+
+    def sample(self, history, rng):
+        # Back off to shorter contexts until one has been seen
+        for k in range(len(self.index) - 1, -1, -1):
+            span = self.index[k].get(tuple(history[len(history) - k:]) if k else ())
+            if span is None:
+                continue
+            start, end = span
+            # Running totals restart at each context's slice
+            target = rng.random() * self.cumulative[end - 1]
+            i = bisect.bisect_right(self.cumulative, target, start, end)
+            return self.next_ids[i]
+        return None
+
+
+class ColumnModel:
+    """Column-wise n-gram (Markov chain) model of tile levels.
+
+    Levels are read as sequences of columns; each distinct column gets an
+    id, and the model learns P(column | previous ``order - 1`` columns) with
+    back-off to shorter contexts. Every tag seen in training gets its own
+    table alongside the shared one, and ``generate`` picks a table from the
+    words in the prompt.
+    """
+    def __init__(self, order=3, height=None):
+        self.order = order
+        self.height = height
+        self.columns = []
+        self.tables = {}
+
+    def fit(self, levels, tags=None):
+        levels = [list(level) for level in levels]
+        if tags is None:
+            tags = [tag_level(level) for level in levels]
+        if self.height is None:
+            self.height = max((len(level) for level in levels), default=1)
+        vocab = {}
+        counts = defaultdict(lambda: [defaultdict(Counter) for _ in range(self.order)])
+        for level, level_tags in zip(levels, tags):
+            ids = []
+            for column in level_columns(level, self.height):
+                ids.append(vocab.setdefault(column, len(vocab)))
+            history = [START] * (self.order - 1)
+            for column_id in ids:
+                for tag in ('',) + tuple(level_tags):
+                    for k in range(self.order):
+                        context = tuple(history[len(history) - k:]) if k else ()
+                        counts[tag][k][context][column_id] += 1
+                history.append(column_id)
+        self.columns = [None] * len(vocab)
+        for column, column_id in vocab.items():
+            self.columns[column_id] = column
+        self.tables = {tag: _Table(tag_counts, self.order)
+                       for tag, tag_counts in counts.items()}
+        return self
+
+    def table_for(self, prompt):
+        prompt = prompt.lower()
+        for tag in self.tables:
+            if tag and (tag in prompt or tag.rstrip('s') in prompt):
+                return self.tables[tag]
+        return self.tables['']
+
+    def generate(self, width, prompt="", rng=random):
+        """Sample a level ``width`` columns wide; returns a list of rows."""
+        if not self.tables:
+            raise ValueError("the model has not been trained")
+        table = self.table_for(prompt)
+        history = [START] * (self.order - 1)
+        ids = []
+        for _ in range(width):
+            column_id = table.sample(history, rng)
+            if column_id is None:
+                column_id = self.tables[''].sample(history, rng)
+            ids.append(column_id)
+            history.append(column_id)
+            del history[0]
+        columns = [self.columns[i] for i in ids]
+        return [''.join(column[y] for column in columns) for y in range(self.height)]
+
+
+def load_corpus(level_dir=LEVEL_DIR):
+    levels = []
+    for path in sorted(glob.glob(os.path.join(level_dir, "*.txt"))):
+        with open(path) as f:
+            levels.append(f.read().splitlines())
+    return levels
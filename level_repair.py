@@ -0,0 +1,168 @@
+import random
+import sys
+import time
+
+import numpy as np
+
+from jump_tables import TABLES
+from level_solver import GOAL, ReachabilityGraph, _random_level
+from physics import TILE_SIZE
+from tiles import SOLID_TILES
+
+PLAYER_X = 100  # spawn x in pixels; the player starts on the bottom row
+
+# Solid test by tile byte
+SOLID = np.zeros(256, dtype=bool)
+SOLID[[ord(tile) for tile in SOLID_TILES]] = True
+OPEN = ord(' ')
+BLOCK = ord('B')
+
+# Tallest step up the player can land on, from the jump tables
+MAX_RISE = TABLES.apex_tiles
+# Widest gap in the floor, well inside a running jump's reach
+MAX_GAP = 4
+# Open rows kept above the floor where the player spawns
+SPAWN_CLEARANCE = 3
+
+
+def _as_grid(level):
+    rows = [''.join(row) for row in level]
+    width = max((len(row) for row in rows), default=0)
+    data = ''.join(row.ljust(width) for row in rows).encode('latin-1')
+    return np.frombuffer(data, dtype=np.uint8).reshape(len(rows), width).copy()
+
+
+def clear_spawn(grid, player_x=PLAYER_X, clearance=SPAWN_CLEARANCE):
+    """Open the rows above the floor at the spawn and put floor under it."""
+    height = grid.shape[0]
+    first, last = player_x // TILE_SIZE, (player_x + TILE_SIZE - 1) // TILE_SIZE
+    columns = grid[:, first:last + 1]
+    above = columns[max(height - 1 - clearance, 0):height - 1]
+    above[SOLID[above]] = OPEN
+    columns[-1][~SOLID[columns[-1]]] = BLOCK
+
+
+def limit_steps(grid, rise=MAX_RISE):
+    """Cut floor stacks so no column is more than ``rise`` above the last.
+
+    A stack is the run of solid tiles rising from the bottom row. Walking
+    rightwards, the tallest each column may be is
+    ``min(h[j] + rise * (x - j))`` over the columns j before it, which is
+    ``rise * x + cummin(h - rise * x)``; gap columns don't constrain it.
+    """
+    height, width = grid.shape
+    solid = SOLID[grid]
+    stack = np.cumprod(solid[::-1], axis=0, dtype=np.uint8)[::-1].astype(bool)
+    heights = stack.sum(axis=0)
+    x = np.arange(width)
+    slack = np.where(heights > 0, heights - rise * x, height)
+    allowed = rise * x + np.minimum.accumulate(slack)
+    from_bottom = (height - 1 - np.arange(height))[:, None]
+    cut = stack & (from_bottom >= allowed[None, :])
+    grid[cut] = OPEN
+    return int(cut.sum())
+
+
+def fill_gaps(grid, max_gap=MAX_GAP):
+    """Put a floor tile into any gap wider than ``max_gap``."""
+    floor = grid[-1]
+    open_floor = np.concatenate(([False], ~SOLID[floor], [False]))
+    edges = np.flatnonzero(np.diff(open_floor.astype(np.int8)))
+    filled = 0
+    for start, end in zip(edges[::2], edges[1::2]):
+        posts = np.arange(start + max_gap, end, max_gap + 1)
+        floor[posts] = BLOCK
+        filled += len(posts)
+    return filled
+
+
+def _frontier(rows, start):
+    # Reachable node furthest right (lowest on ties), or None if the exit is
+    # reachable from start
+    graph = ReachabilityGraph(rows)
+    seen = {start}
+    todo = [start]
+    while todo:
+        node = todo.pop()
+        for target, _ in graph.neighbors(node):
+            if target == GOAL:
+                return None
+            if target not in seen:
+                seen.add(target)
+                todo.append(target)
+    return max(seen)
+
+
+def connect_exit(grid, player_x=PLAYER_X):
+    """Bridge forward from the furthest reachable spot until the exit is."""
+    height, width = grid.shape
+    start = (player_x // TILE_SIZE, height - 2)
+    bridged = 0
+    for _ in range(width):
+        rows = [row.tobytes().decode('latin-1') for row in grid]
+        frontier = _frontier(rows, start)
+        if frontier is None:
+            break
+        x, y = frontier
+        for column in range(x + 1, min(x + 3, width)):
+            above = grid[:y + 1, column]
+            above[SOLID[above]] = OPEN
+            grid[y + 1, column] = BLOCK
+            bridged += 1
+    return bridged
+
+
+def repair_level(level, player_x=PLAYER_X, verify=True):
+    """Return ``level`` (rows of tile characters) made playable.
+
+    The NumPy passes clear the spawn, cut stacks that can't be jumped onto
+    and close gaps too wide to jump. With ``verify`` the solver then
+    confirms the exit is reachable, bridging forward from where the player
+    gets stuck if not; that costs about one solver run per level. Rows
+    come back as lists of characters, like generate_smw_level's.
+    """
+    grid = _as_grid(level)
+    if grid.size:
+        clear_spawn(grid, player_x)
+        limit_steps(grid)
+        fill_gaps(grid)
+        if verify:
+            connect_exit(grid, player_x)
+    return [list(row.tobytes().decode('latin-1')) for row in grid]
+
+
+def _smw_like_level(width=25, height=15):
+    # generate_smw_level's shape plus random floor gaps, without pygame
+    level = _random_level(width, height)
+    for _ in range(random.randint(3, 6)):
+        length = random.randint(2, 5)
+        x = random.randint(0, width - length)
+        y = random.randint(height // 2, height - 2)
+        level[y][x:x + length] = ["B"] * length
+    return level
+
+
+def _benchmark(count=2000):
+    from level_solver import is_solvable
+
+    start = (PLAYER_X // TILE_SIZE, 13)
+    began = time.perf_counter()
+    levels = [_smw_like_level() for _ in range(count)]
+    generate = (time.perf_counter() - began) / count
+    began = time.perf_counter()
+    before = sum(is_solvable(level, start) for level in levels)
+    check = (time.perf_counter() - began) / count
+    tries = count / max(before, 1)
+    print(f"unrepaired: {before}/{count} solvable from the spawn; rejection sampling "
+          f"{tries * (generate + check) * 1000:.2f} ms per playable level ({tries:.1f} tries)")
+    for verify in (False, True):
+        began = time.perf_counter()
+        repaired = [repair_level(level, verify=verify) for level in levels]
+        repair = (time.perf_counter() - began) / count
+        after = sum(is_solvable(level, start) for level in repaired)
+        print(f"repair{' + verify' if verify else ''}: {after}/{count} solvable, "
+              f"{repair * 1000:.2f} ms per level")
+
+
+if __name__ == "__main__":
+    _benchmark(*map(int, sys.argv[1:2]))
@@ -0,0 +1,168 @@
+import heapq
+import math
+import random
+import time
+
+from jump_tables import TABLES
+from tiles import SOLID_TILES
+
+GOAL = 'goal'
+
+
+class ReachabilityGraph:
+    """Standable tiles of a level and the moves that connect them.
+
+    Nodes are (x, y) cells the player can stand in. Edges are walks to an
+    adjacent tile, jumps and walk-off falls, weighted by frames taken.
+    Edges are built on first use and cached, so A* only pays for the part
+    of the level it explores; ``build()`` fills in the whole graph. Arcs
+    come from ``tables``, the shared jump tables by default.
+    """
+    def __init__(self, level, player_height=1, goal_x=None, tables=TABLES):
+        self.rows = [''.join(row) for row in level]
+        self.height = len(self.rows)
+        self.width = max((len(row) for row in self.rows), default=0)
+        self.player_height = player_height
+        self.goal_x = self.width - 1 if goal_x is None else goal_x
+        self.edges = {}
+        self.tries = tables.tries
+        self.walk_cost = tables.physics['tile'] / tables.physics['speed']
+        self.solid_cells = {(x, y) for y, row in enumerate(self.rows)
+                            for x, tile in enumerate(row) if tile in SOLID_TILES}
+        # Cells the player's body cannot occupy, for its full height
+        self.blocked = {(x, y + k) for x, y in self.solid_cells
+                        for k in range(player_height)}
+
+    def solid(self, x, y):
+        return (x, y) in self.solid_cells
+
+    def free(self, x, y):
+        return (0 <= x < self.width and y < self.height
+                and (x, y) not in self.blocked)
+
+    def standable(self, x, y):
+        return self.free(x, y) and self.solid(x, y + 1)
+
+    def nodes(self):
+        return [(x, y) for y in range(self.height) for x in range(self.width)
+                if self.standable(x, y)]
+
+    def _follow(self, x, y, trie, start_frame, add):
+        # Walk every arc from (x, y) at once, reporting each landing
+        width, height, goal_x = self.width, self.height, self.goal_x
+        blocked, solid_cells = self.blocked, self.solid_cells
+        stack = [trie]
+        while stack:
+            for (dx, dy, descending), (frame, children) in stack.pop().items():
+                cx, cy = x + dx, y + dy
+                if not (0 <= cx < width and cy < height) or (cx, cy) in blocked:
+                    continue
+                if cx >= goal_x:
+                    add(GOAL, start_frame + frame)
+                elif descending and (cx, cy + 1) in solid_cells:
+                    add((cx, cy), start_frame + frame)
+                elif children:
+                    stack.append(children)
+
+    def neighbors(self, node):
+        cached = self.edges.get(node)
+        if cached is not None:
+            return cached
+        x, y = node
+        walk_cost = self.walk_cost
+        found = {}
+
+        def add(target, cost):
+            if target != node and cost < found.get(target, math.inf):
+                found[target] = cost
+
+        for direction in (1, -1):
+            nx = x + direction
+            if nx >= self.goal_x and self.free(nx, y):
+                add(GOAL, walk_cost)
+            elif self.standable(nx, y):
+                add((nx, y), walk_cost)
+            elif self.free(nx, y):
+                self._follow(nx, y, self.tries['fall'][direction], walk_cost, add)
+            self._follow(x, y, self.tries['jump'][direction], 0, add)
+
+        self.edges[node] = edges = list(found.items())
+        return edges
+
+    def build(self):
+        for node in self.nodes():
+            self.neighbors(node)
+        return self.edges
+
+    def default_start(self):
+        # Lowest standable tile in the leftmost column that has one
+        for x in range(self.width):
+            for y in range(self.height - 1, -1, -1):
+                if self.standable(x, y):
+                    return (x, y)
+        return None
+
+    def find_path(self, start=None):
+        """A* from ``start`` to the exit column; returns the node list or None."""
+        start = self.default_start() if start is None else start
+        if start is None or not self.standable(*start):
+            return None
+        walk_cost = self.walk_cost
+
+        def heuristic(node):
+            return max(0, self.goal_x - node[0]) * walk_cost
+
+        open_heap = [(heuristic(start), 0.0, start)]
+        came_from = {start: None}
+        best = {start: 0.0}
+        while open_heap:
+            _, cost, node = heapq.heappop(open_heap)
+            if node == GOAL:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = came_from[node]
+                return path[::-1]
+            if cost > best[node]:
+                continue
+            for target, step in self.neighbors(node):
+                new_cost = cost + step
+                if new_cost < best.get(target, math.inf):
+                    best[target] = new_cost
+                    came_from[target] = node
+                    h = 0 if target == GOAL else heuristic(target)
+                    heapq.heappush(open_heap, (new_cost + h, new_cost, target))
+        return None
+
+
+def find_path(level, start=None, player_height=1):
+    return ReachabilityGraph(level, player_height).find_path(start)
+
+
+def is_solvable(level, start=None, player_height=1):
+    return find_path(level, start, player_height) is not None
+
+
+def _random_level(width=25, height=15):
+    # Same shape as generate_smw_level, without needing pygame
+    level = [[" "] * width for _ in range(height)]
+    level[-1] = ["B"] * width
+    for _ in range(random.randint(1, 4)):
+        x = random.randint(2, width - 5)
+        for i in range(random.randint(1, 4)):
+            level[-1][x + i] = " "
+    for _ in range(random.randint(2, 4)):
+        x = random.randint(5, width - 4)
+        for y in range(1, random.randint(2, 5) + 1):
+            level[-y][x] = "B"
+            level[-y][x + 1] = "B"
+    return level
+
+
+if __name__ == "__main__":
+    levels = [_random_level() for _ in range(500)]
+    start_time = time.perf_counter()
+    solvable = sum(is_solvable(level) for level in levels)
+    elapsed = time.perf_counter() - start_time
+    print(f"{solvable}/{len(levels)} solvable, "
+          f"{len(levels) / elapsed:.0f} levels/s")
@@ -0,0 +1,256 @@
+import hashlib
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+
+from level_format import pack_level, unpack_level
+from level_solver import is_solvable
+from map_elites import describe, level_rows
+
+STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels.sqlite")
+
+# Feature columns, in table order; all of them can be filtered in ``query``
+FEATURES = (
+    'width', 'height', 'gaps', 'platform_density', 'pipes',
+    'coins', 'enemies', 'solvable', 'fitness',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS levels (
+    id INTEGER PRIMARY KEY,
+    hash BLOB NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    prompt TEXT,
+    created REAL NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    gaps INTEGER NOT NULL,
+    platform_density REAL NOT NULL,
+    pipes INTEGER NOT NULL,
+    coins INTEGER NOT NULL,
+    enemies INTEGER NOT NULL,
+    solvable INTEGER NOT NULL,
+    fitness REAL,
+    tiles BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS levels_solvable_pipes_coins ON levels (solvable, pipes, coins);
+CREATE INDEX IF NOT EXISTS levels_solvable_gaps ON levels (solvable, gaps);
+CREATE INDEX IF NOT EXISTS levels_enemies ON levels (enemies);
+CREATE INDEX IF NOT EXISTS levels_width ON levels (width);
+CREATE INDEX IF NOT EXISTS levels_fitness ON levels (fitness);
+"""
+
+
+def level_hash(level):
+    """Content hash of a level; trailing spaces don't change it."""
+    rows = [row.rstrip() for row in level_rows(level)]
+    return hashlib.blake2b('\n'.join(rows).encode('latin-1'), digest_size=16).digest()
+
+
+def level_features(level, fitness=None):
+    """Feature row for ``level`` as a dict keyed by FEATURES."""
+    rows = level_rows(level)
+    width = max((len(row) for row in rows), default=0)
+    gaps, density, pipes = describe(rows)
+    # Levels whose top row holds tiles (MarioGPT patterns are a single row
+    # of ground) get a row of sky so the player has somewhere to stand
+    padded = rows
+    if rows and rows[0].strip():
+        padded = [' ' * width] + rows
+    return {
+        'width': width,
+        'height': len(rows),
+        'gaps': gaps,
+        'platform_density': density,
+        'pipes': pipes,
+        'coins': sum(row.count('C') for row in rows),
+        'enemies': sum(row.count('E') for row in rows),
+        'solvable': int(bool(rows) and is_solvable(padded)),
+        'fitness': fitness,
+    }
+
+
+class LevelStore:
+    """Generated levels in SQLite, indexed by their features.
+
+    Each level is stored once, keyed by its content hash, as a packed
+    level_format record next to its feature columns. Adding a level that is
+    already stored keeps the first row and returns its id. The connection
+    is shared between threads, so the Tk apps can add from their workers;
+    game loops use ``add_later``, which leaves the solver run and the
+    commit to a background writer.
+    """
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.writer = None
+        with self.lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.executescript(SCHEMA)
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM levels").fetchone()[0]
+
+    def _row(self, level, source, prompt, fitness, now):
+        features = level_features(level, fitness)
+        return (level_hash(level), source, prompt, now,
+                *(features[name] for name in FEATURES), pack_level(level_rows(level)))
+
+    def add_many(self, levels, source, prompt=None, fitness=None):
+        """Store ``levels``; ``fitness`` is one value for all or one per level.
+
+        Returns the row ids in the order given.
+        """
+        levels = list(levels)
+        if not isinstance(fitness, (list, tuple)):
+            fitness = [fitness] * len(levels)
+        now = time.time()
+        rows = [self._row(level, source, prompt, score, now)
+                for level, score in zip(levels, fitness)]
+        columns = ', '.join(('hash', 'source', 'prompt', 'created') + FEATURES + ('tiles',))
+        marks = ', '.join('?' * (len(FEATURES) + 5))
+        with self.lock, self.db:
+            self.db.executemany(
+                f"INSERT OR IGNORE INTO levels ({columns}) VALUES ({marks})", rows)
+            return [self.db.execute("SELECT id FROM levels WHERE hash = ?",
+                                    (row[0],)).fetchone()[0] for row in rows]
+
+    def add(self, level, source, prompt=None, fitness=None):
+        return self.add_many([level], source, prompt, fitness)[0]
+
+    def add_later(self, level, source, prompt=None, fitness=None):
+        """Queue ``level`` for the writer thread and return at once.
+
+        Levels queued while a write is under way go into the next one
+        together, so a burst costs one commit. ``flush`` waits for them.
+        """
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._write, daemon=True)
+            self.writer.start()
+        self.pending.put((level, source, prompt, fitness))
+
+    def _write(self):
+        while True:
+            batch = [self.pending.get()]
+            while True:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            groups = {}
+            for level, source, prompt, fitness in batch:
+                if level is not None:
+                    group = groups.setdefault((source, prompt), ([], []))
+                    group[0].append(level)
+                    group[1].append(fitness)
+            for (source, prompt), (levels, fitness) in groups.items():
+                try:
+                    self.add_many(levels, source, prompt, fitness)
+                except Exception:
+                    traceback.print_exc()
+            for _ in batch:
+                self.pending.task_done()
+            if any(item[0] is None for item in batch):
+                return
+
+    def flush(self):
+        self.pending.join()
+
+    def get(self, level_id):
+        """Rows of a stored level, or None."""
+        row = self.db.execute("SELECT tiles FROM levels WHERE id = ?", (level_id,)).fetchone()
+        return unpack_level(row[0]) if row else None
+
+    def features(self, level_id):
+        row = self.db.execute(f"SELECT {', '.join(FEATURES)} FROM levels WHERE id = ?",
+                              (level_id,)).fetchone()
+        return dict(zip(FEATURES, row)) if row else None
+
+    def query(self, order_by=None, limit=100, source=None, **filters):
+        """Ids of levels matching feature filters.
+
+        Filters are ``feature=value`` for equality and ``min_feature`` /
+        ``max_feature`` for inclusive bounds, e.g.
+        ``query(solvable=True, min_pipes=3, max_coins=9)``. ``order_by`` is
+        a feature name, prefixed with '-' for descending.
+        """
+        clauses, params = [], []
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(source)
+        for key, value in filters.items():
+            op, name = '=', key
+            if key.startswith('min_'):
+                op, name = '>=', key[4:]
+            elif key.startswith('max_'):
+                op, name = '<=', key[4:]
+            if name not in FEATURES:
+                raise ValueError(f"unknown level feature: {name}")
+            clauses.append(f"{name} {op} ?")
+            params.append(int(value) if isinstance(value, bool) else value)
+
+        sql = "SELECT id FROM levels"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if order_by:
+            name = order_by.lstrip('-')
+            if name not in FEATURES:
+                raise ValueError(f"unknown level feature: {name}")
+            sql += f" ORDER BY {name} {'DESC' if order_by.startswith('-') else 'ASC'}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [row[0] for row in self.db.execute(sql, params)]
+
+    def close(self):
+        if self.writer is not None:
+            self.pending.put((None, None, None, None))
+            self.writer.join()
+            self.writer = None
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _benchmark(count=200000, path=":memory:"):
+    # Insert random levels, then time an indexed feature query
+    from level_solver import _random_level
+    import random
+
+    store = LevelStore(path)
+    batch = [_random_level() for _ in range(1000)]
+    start = time.perf_counter()
+    store.add_many(batch, 'benchmark')
+    print(f"features + insert: {len(batch) / (time.perf_counter() - start):.0f} levels/s")
+
+    # Fill the rest with synthetic feature rows; the query cost is the point
+    rng = random.Random(0)
+    tiles = pack_level(batch[0])
+    columns = ', '.join(('hash', 'source', 'created') + FEATURES + ('tiles',))
+    rows = ((rng.randbytes(16), 'benchmark', 0.0, 25, 15, rng.randint(0, 6), rng.random(),
+             rng.randint(0, 6), rng.randint(0, 20), rng.randint(0, 5), rng.random() < 0.7,
+             rng.random() * 10, tiles) for _ in range(count))
+    with store.db:
+        store.db.executemany(
+            f"INSERT INTO levels ({columns}) VALUES ({', '.join('?' * 13)})", rows)
+
+    start = time.perf_counter()
+    found = store.query(solvable=True, min_pipes=3, max_coins=9, limit=None)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{len(store)} rows: solvable, 3+ pipes, under 10 coins -> "
+          f"{len(found)} ids in {elapsed:.1f} ms")
+    store.close()
+
+
+if __name__ == "__main__":
+    _benchmark(*map(int, sys.argv[1:2]))
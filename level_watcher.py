@@ -0,0 +1,71 @@
+import glob
+import os
+import sys
+import time
+
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")
+
+
+class LevelWatcher:
+    """Notice edited, added and removed level files by polling mtimes.
+
+    ``poll`` is cheap enough to call every frame: it stats the directory's
+    level files at most every ``interval`` seconds and returns the paths
+    whose modification time or size changed since the last scan.
+    """
+    def __init__(self, directory=LEVEL_DIR, pattern="*.txt", interval=0.25):
+        self.directory = directory
+        self.pattern = pattern
+        self.interval = interval
+        self.last_scan = time.monotonic()
+        self.stamps = self._scan()
+
+    def _scan(self):
+        stamps = {}
+        for path in glob.glob(os.path.join(self.directory, self.pattern)):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # removed between the listing and the stat
+            stamps[path] = (st.st_mtime_ns, st.st_size)
+        return stamps
+
+    def poll(self):
+        """(changed, added, removed) path sets; all empty if nothing moved."""
+        now = time.monotonic()
+        if now - self.last_scan < self.interval:
+            return set(), set(), set()
+        self.last_scan = now
+        stamps = self._scan()
+        old = self.stamps
+        self.stamps = stamps
+        changed = {path for path in stamps.keys() & old.keys() if stamps[path] != old[path]}
+        return changed, stamps.keys() - old.keys(), old.keys() - stamps.keys()
+
+
+def main(directory=LEVEL_DIR):
+    # Re-check each level as it is saved: a quick loop for designers and CI
+    from level_solver import is_solvable
+
+    watcher = LevelWatcher(directory)
+    print(f"watching {directory}")
+    while True:
+        changed, added, removed = watcher.poll()
+        for path in sorted(changed | added):
+            start = time.perf_counter()
+            try:
+                with open(path) as f:
+                    rows = f.read().splitlines()
+            except OSError as exc:
+                print(f"{path}: {exc}")
+                continue
+            verdict = "solvable" if is_solvable(rows) else "NOT solvable"
+            print(f"{os.path.basename(path)}: {verdict} "
+                  f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+        for path in sorted(removed):
+            print(f"{os.path.basename(path)}: removed")
+        time.sleep(watcher.interval)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,158 @@
+import math
+import random
+from array import array
+
+from tiles import SOLID_TILES
+
+# Descriptor axes: (name, largest value kept apart, bins)
+AXES = (
+    ('gaps', 10, 10),
+    ('platform_density', 1.0, 10),
+    ('pipes', 10, 10),
+)
+
+
+def level_rows(level):
+    if isinstance(level, str):
+        return level.split('\n')
+    return [''.join(row) for row in level]
+
+
+def describe(level):
+    """(gap count, platform density, pipe count) of a level.
+
+    Gaps are runs of open tiles in the bottom row, platform density is the
+    share of solid tiles above the bottom row (the row itself for one-row
+    levels) and pipes are runs of adjacent columns that contain '|' or
+    whose solid tiles rise at least two high from the bottom row.
+    """
+    rows = level_rows(level)
+    if not rows:
+        return (0, 0.0, 0)
+    width = max(len(row) for row in rows)
+    rows = [row.ljust(width) for row in rows]
+    bottom = rows[-1]
+
+    gaps = 0
+    open_run = False
+    for tile in bottom:
+        is_open = tile not in SOLID_TILES
+        if is_open and not open_run:
+            gaps += 1
+        open_run = is_open
+
+    upper = rows[:-1] or rows
+    cells = sum(len(row) for row in upper)
+    solid = sum(tile in SOLID_TILES for row in upper for tile in row)
+    density = solid / cells if cells else 0.0
+
+    pipes = 0
+    in_pipe = False
+    for x in range(width):
+        stack = 0
+        for row in reversed(rows):
+            if row[x] not in SOLID_TILES:
+                break
+            stack += 1
+        has_pipe = stack >= 2 or any(row[x] == '|' for row in rows)
+        if has_pipe and not in_pipe:
+            pipes += 1
+        in_pipe = has_pipe
+    return (gaps, density, pipes)
+
+
+class EliteArchive:
+    """MAP-Elites archive over level descriptors.
+
+    The descriptor space is cut into a fixed grid of bins; each cell keeps
+    the fittest level seen with that descriptor. Fitness and normalised
+    descriptors live in flat arrays indexed by cell, so ``add`` is O(1).
+    ``novelty`` is the mean distance to the k nearest archived levels,
+    found by searching rings of cells outward from the query's own cell.
+    """
+    def __init__(self, axes=AXES, describe=describe):
+        self.axes = axes
+        self.describe = describe
+        self.bins = [bins for _, _, bins in axes]
+        self.size = 1
+        for bins in self.bins:
+            self.size *= bins
+        self.fitness = array('d', [-math.inf]) * self.size
+        self.points = array('d', [0.0]) * (self.size * len(axes))
+        self.elites = [None] * self.size
+        self.filled = []  # occupied cell indices, for uniform sampling
+
+    def __len__(self):
+        return len(self.filled)
+
+    def normalise(self, descriptor):
+        return tuple(min(max(value / limit, 0.0), 1.0)
+                     for value, (_, limit, _) in zip(descriptor, self.axes))
+
+    def coords(self, point):
+        return tuple(min(int(v * bins), bins - 1) for v, bins in zip(point, self.bins))
+
+    def cell(self, coords):
+        index = 0
+        for c, bins in zip(coords, self.bins):
+            index = index * bins + c
+        return index
+
+    def add(self, level, fitness, descriptor=None):
+        """Store ``level`` if it beats its cell's elite; returns True if stored."""
+        point = self.normalise(descriptor or self.describe(level))
+        index = self.cell(self.coords(point))
+        if fitness <= self.fitness[index]:
+            return False
+        if self.elites[index] is None:
+            self.filled.append(index)
+        self.fitness[index] = fitness
+        self.elites[index] = level
+        dims = len(self.axes)
+        self.points[index * dims:(index + 1) * dims] = array('d', point)
+        return True
+
+    def sample(self, k=1, rng=random):
+        return [self.elites[i] for i in rng.choices(self.filled, k=k)] if self.filled else []
+
+    def _ring(self, centre, radius):
+        # Cells at exactly Chebyshev distance ``radius`` from ``centre``
+        ranges = [range(max(c - radius, 0), min(c + radius, bins - 1) + 1)
+                  for c, bins in zip(centre, self.bins)]
+
+        def walk(dim, prefix, on_edge):
+            if dim == len(ranges):
+                if on_edge:
+                    yield prefix
+                return
+            for c in ranges[dim]:
+                yield from walk(dim + 1, prefix + (c,),
+                                on_edge or abs(c - centre[dim]) == radius)
+        return walk(0, (), radius == 0)
+
+    def novelty(self, level, k=5, descriptor=None):
+        """Mean distance to the k nearest archived levels (1.0 if empty)."""
+        if not self.filled:
+            return 1.0
+        point = self.normalise(descriptor or self.describe(level))
+        centre = self.coords(point)
+        dims = len(self.axes)
+        step = 1.0 / max(self.bins)
+        nearest = []
+        for radius in range(max(self.bins)):
+            for coords in self._ring(centre, radius):
+                index = self.cell(coords)
+                if self.elites[index] is None:
+                    continue
+                other = self.points[index * dims:(index + 1) * dims]
+                nearest.append(math.dist(point, other))
+            nearest.sort()
+            del nearest[k:]
+            # Anything in the next ring is at least ``radius * step`` away
+            if len(nearest) == k and nearest[-1] <= radius * step:
+                break
+        return sum(nearest) / len(nearest)
+
+    def levels(self):
+        """Archived levels, fittest first."""
+        return [self.elites[i] for i in sorted(self.filled, key=lambda i: -self.fitness[i])]
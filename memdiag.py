@@ -0,0 +1,115 @@
+import atexit
+import gc
+import linecache
+import os
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+# Opt in with --memdiag on the command line or SMB_MEMDIAG in the environment
+MEMDIAG = "--memdiag" in sys.argv or bool(os.environ.get("SMB_MEMDIAG"))
+LOG_PATH = os.environ.get("SMB_MEMDIAG_LOG", "memdiag.log")
+# Traced-memory budget in MB; going over it is logged on every report
+BUDGET_MB = float(os.environ.get("SMB_MEM_BUDGET_MB", 0)) or None
+
+# Allocations made by the diagnostics themselves are left out of reports
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def live_sprites():
+    return [obj for obj in gc.get_objects() if isinstance(obj, pygame.sprite.Sprite)]
+
+
+def sprite_counts():
+    """Live sprites and the distinct surfaces they draw with."""
+    sprites = live_sprites()
+    images = {id(sprite.image) for sprite in sprites if getattr(sprite, 'image', None)}
+    return {'sprites': len(sprites), 'sprite surfaces': len(images)}
+
+
+class MemoryDiagnostics:
+    """Periodic memory reports for long play or generation sessions.
+
+    ``tick`` is cheap to call every frame or generation; every ``interval``
+    seconds it takes a tracemalloc snapshot, compares it with the previous
+    one and appends the allocation sites that grew most, the traced total
+    and every watched count to the log, as it also does on creation and at
+    exit. Counts are registered with ``watch``, optionally with a budget;
+    anything over budget is logged as such and kept in ``violations``.
+    """
+    def __init__(self, name, path=LOG_PATH, interval=10.0, top=10, budget_mb=BUDGET_MB):
+        self.name = name
+        self.path = path
+        self.interval = interval
+        self.top = top
+        self.budget = budget_mb
+        self.counters = {}
+        self.violations = []
+        self.watch_many(sprite_counts)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.started = time.perf_counter()
+        self.previous = self._snapshot()
+        # A baseline now, and a last report however the session ends
+        self.report(self.started)
+        atexit.register(self.report)
+
+    def watch(self, name, count, budget=None):
+        """Report ``count()`` under ``name``; ``budget`` is its upper limit."""
+        self.counters[name] = (lambda: {name: count()}, {name: budget})
+
+    def watch_many(self, counts, budgets=None):
+        """Report a callable returning several named counts at once."""
+        self.counters[counts] = (counts, budgets or {})
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
+    def _log(self, lines):
+        with open(self.path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def tick(self):
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.report(now)
+
+    def report(self, now=None):
+        now = now or time.perf_counter()
+        self.last_report = now
+        snapshot = self._snapshot()
+        growing = [stat for stat in snapshot.compare_to(self.previous, 'lineno')
+                   if stat.size_diff > 0][:self.top]
+        self.previous = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+
+        lines = [f"[{now - self.started:8.1f}s {self.name} pid {os.getpid()}] "
+                 f"traced {current / 2**20:.1f} MB, peak {peak / 2**20:.1f} MB"]
+        over = []
+        if self.budget and current > self.budget * 2**20:
+            over.append(f"traced {current / 2**20:.1f} MB > {self.budget:g} MB")
+        counts = []
+        for counter, budgets in self.counters.values():
+            for name, value in counter().items():
+                limit = budgets.get(name)
+                counts.append(f"{name} {value}" + (f"/{limit}" if limit else ""))
+                if limit and value > limit:
+                    over.append(f"{name} {value} > {limit}")
+        lines.append("  counts: " + ", ".join(counts))
+        for stat in growing:
+            frame = stat.traceback[0]
+            lines.append(f"  +{stat.size_diff / 1024:9.1f} KiB {stat.count_diff:+7d} blocks  "
+                         f"{os.path.basename(frame.filename)}:{frame.lineno}")
+        for problem in over:
+            lines.append(f"  OVER BUDGET: {problem}")
+        self.violations += over
+        self._log(lines)
+        return over
@@ -0,0 +1,8 @@
+# Game physics, shared by the pygame loops, the ECS core, the game server
+# and the jump tables the solver and level repair are built from. Change
+# them here and everything that reasons about jumps follows.
+TILE_SIZE = 32
+PLAYER_SPEED = 5
+GRAVITY = 0.4
+JUMP_FORCE = -9
+ENEMY_SPEED = 2
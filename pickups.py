@@ -0,0 +1,56 @@
+from collections import Counter
+
+from physics import TILE_SIZE
+
+# Points awarded per collected pickup kind
+POINTS = {
+    'coin': 100,
+}
+
+
+class PickupGrid:
+    """Pickups in a sparse dict keyed by tile cell.
+
+    ``collect`` only looks at the cells a rect overlaps, so the cost per
+    frame stays the same however many pickups the level holds. Collected
+    sprites are killed, which also removes them from any drawing group.
+    """
+    def __init__(self, tile_size=TILE_SIZE):
+        self.tile_size = tile_size
+        self.cells = {}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def add(self, sprite, x, y):
+        self.cells[(x, y)] = sprite
+
+    def collect(self, rect):
+        size = self.tile_size
+        collected = []
+        for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+                sprite = self.cells.get((cx, cy))
+                if sprite is not None and rect.colliderect(sprite.rect):
+                    del self.cells[(cx, cy)]
+                    sprite.kill()
+                    collected.append(sprite)
+        return collected
+
+
+class Stats:
+    """Running counts and score for a play session."""
+    def __init__(self, points=POINTS):
+        self.points = points
+        self.counts = Counter()
+        self.score = 0
+
+    def record(self, kind, count=1):
+        if count:
+            self.counts[kind] += count
+            self.score += self.points.get(kind, 0) * count
+
+    def summary(self):
+        parts = [f"Score {self.score}"]
+        parts += [f"{kind} {count}" for kind, count in sorted(self.counts.items())]
+        return "  ".join(parts)
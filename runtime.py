@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+import pygame
+
+# Print the startup timings once the first frame is up
+TIMING = "--timing" in sys.argv or bool(os.environ.get("SMB_TIMING"))
+
+
+def arguments():
+    """Command-line arguments other than the ``--flag`` switches.
+
+    The flags are read straight from sys.argv by the modules that own them,
+    so entry points taking a path or a port skip past them here.
+    """
+    return [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+
+
+def _process_start():
+    """Wall-clock time the process started, or now if it can't be read."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the command name; starttime is field 22 overall
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        age = uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        return time.time() - age
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.time()
+
+
+PROCESS_START = _process_start()
+marks = {"import": time.time() - PROCESS_START}
+
+
+def mark(name):
+    """Record seconds since process start for ``name``, once."""
+    marks.setdefault(name, time.time() - PROCESS_START)
+
+
+def report():
+    return "startup: " + ", ".join(f"{name} {seconds * 1000:.0f} ms"
+                                   for name, seconds in marks.items())
+
+
+def init_pygame(video=True, audio=False):
+    """Start only the pygame subsystems a caller needs.
+
+    ``pygame.init()`` opens every subsystem, audio included, which nothing
+    here uses; games need video for the window and keyboard, and headless
+    tools can import the game modules without starting anything.
+    """
+    if video and not pygame.display.get_init():
+        pygame.display.init()
+    if audio and not pygame.mixer.get_init():
+        pygame.mixer.init()
+    mark("init")
+
+
+def first_frame():
+    if "first_frame" in marks:
+        return
+    mark("first_frame")
+    if TIMING:
+        print(report(), file=sys.stderr)
@@ -1,17 +1,25 @@
 import pygame
 import sys
+import os
+import glob
+import queue
+import threading
+import traceback
 
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init()
+from dirty_render import DIRTY_RECTS, DirtyRenderer
+from frame_pacing import FixedStep
+from level_loader import LEVEL_EXTENSIONS, BuiltLevel, LevelFile, file_stamp
+from level_watcher import LevelWatcher
+from memdiag import MEMDIAG, MemoryDiagnostics
+from physics import GRAVITY, JUMP_FORCE, PLAYER_SPEED, TILE_SIZE
+from pickups import PickupGrid, Stats
+from runtime import first_frame, init_pygame
 
 # Game constants
 WIDTH, HEIGHT = 800, 600
 FPS = 60
-TILE_SIZE = 32
-PLAYER_SPEED = 5
-GRAVITY = 0.4
-JUMP_FORCE = -9
+
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")
 
 # Colors
 SKY_BLUE = (135, 206, 235)
@@ -21,9 +29,10 @@ BROWN = (139, 69, 19)
 YELLOW = (255, 255, 0)
 WHITE = (255, 255, 255)
 
-class Player(pygame.sprite.Sprite):
+class Player(pygame.sprite.DirtySprite):
     def __init__(self):
         super().__init__()
+        self.dirty = 2  # Moves every frame
         self.image = pygame.Surface((TILE_SIZE, TILE_SIZE))
         self.image.fill(RED)
         self.rect = self.image.get_rect()
@@ -70,14 +79,14 @@ class Player(pygame.sprite.Sprite):
                 elif self.velocity.x < 0:
                     self.rect.left = platform.rect.right
 
-class Block(pygame.sprite.Sprite):
-    def __init__(self, x, y):
+class Block(pygame.sprite.DirtySprite):
+    # One merged run of solid tiles, drawn with its autotiled image
+    def __init__(self, rect, image):
         super().__init__()
-        self.image = pygame.Surface((TILE_SIZE, TILE_SIZE))
-        self.image.fill(BROWN)
-        self.rect = self.image.get_rect(topleft=(x, y))
+        self.image = image
+        self.rect = rect
 
-class Coin(pygame.sprite.Sprite):
+class Coin(pygame.sprite.DirtySprite):
     def __init__(self, x, y):
         super().__init__()
         self.image = pygame.Surface((TILE_SIZE//2, TILE_SIZE//2))
@@ -86,6 +95,7 @@ class Coin(pygame.sprite.Sprite):
 
 class Overworld:
     def __init__(self):
+        self.drawn_node = None
         self.level_nodes = [
             (100, 100),
             (300, 150),
@@ -96,6 +106,7 @@ class Overworld:
         self.current_node = 0
 
     def draw(self, screen):
+        self.drawn_node = self.current_node
         screen.fill(SKY_BLUE)
         
         # Draw paths
@@ -108,17 +119,21 @@ class Overworld:
             pygame.draw.circle(screen, color, (x, y), 20)
 
 def create_level(level_layout):
+    level = BuiltLevel(level_layout, TILE_SIZE)
     platforms = pygame.sprite.Group()
     coins = pygame.sprite.Group()
+    pickups = PickupGrid(TILE_SIZE)
     
-    for y, row in enumerate(level_layout):
-        for x, tile in enumerate(row):
-            if tile == 'B':
-                platforms.add(Block(x * TILE_SIZE, y * TILE_SIZE))
-            elif tile == 'C':
-                coins.add(Coin(x * TILE_SIZE, y * TILE_SIZE))
+    for rect, image in level.pieces:
+        platforms.add(Block(rect, image))
     
-    return platforms, coins
+    for rect in level.coins:
+        x, y = rect.centerx // TILE_SIZE, rect.centery // TILE_SIZE
+        coin = Coin(x * TILE_SIZE, y * TILE_SIZE)
+        coins.add(coin)
+        pickups.add(coin, x, y)
+    
+    return platforms, coins, pickups
 
 # Level layouts
 level_layouts = [
@@ -134,14 +149,191 @@ level_layouts = [
     # Add more level layouts here...
 ]
 
+def fit_layout(rows, exported=False):
+    rows = [''.join(row) for row in rows]
+    if exported:
+        # Exported levels are only as tall as the generator made them;
+        # stand them on the bottom of the screen
+        rows = [''] * (HEIGHT // TILE_SIZE - len(rows)) + rows
+    # Pad rows so editors that strip trailing spaces don't change the layout
+    width = max((len(row) for row in rows), default=0)
+    return [row.ljust(width) for row in rows]
+
+class LevelRegistry:
+    """Level layouts read lazily from LEVEL_DIR, built ahead of time.
+
+    Levels come from .txt files and from the .json and .smba exports of
+    the Tk app, each of which holds many. ``prefetch`` queues levels for a
+    background thread that reads the layout and runs create_level, so
+    ``get`` can usually hand back a finished level straight away. A built
+    level is consumed when played, so it is queued again for the next
+    visit. Falls back to ``level_layouts`` when the directory has no level
+    files. ``refresh`` forgets levels whose files changed on disk;
+    ``versions`` keeps a read or build that was already under way from
+    storing the old layout. Files are kept open in ``files``, so a rescan
+    only reopens the ones that changed and a level is read on its own.
+    """
+    def __init__(self, level_dir=LEVEL_DIR, fallback=level_layouts):
+        self.level_dir = level_dir
+        self.fallback = fallback
+        self.files = {}  # path -> LevelFile
+        self.files_lock = threading.Lock()
+        self.entries = self._scan()
+        self.layouts = {} if self.entries else dict(enumerate(fallback))
+        self.count = len(self.entries) or len(fallback)
+        self.built = {}
+        self.versions = {}
+        self.lock = threading.Lock()
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._work, daemon=True)
+        self.worker.start()
+
+    def __len__(self):
+        return self.count
+
+    def _file(self, path):
+        # The open LevelFile for path, reopened if it changed on disk
+        stamp = file_stamp(path)
+        with self.files_lock:
+            level_file = self.files.get(path)
+            if level_file is None or level_file.stamp != stamp:
+                if level_file is not None:
+                    level_file.close()
+                level_file = self.files[path] = LevelFile(path)
+        return level_file
+
+    def _scan(self):
+        """(path, position) of every level in the directory's level files."""
+        entries = []
+        paths = sorted(glob.glob(os.path.join(self.level_dir, "*")))
+        for path in paths:
+            if os.path.splitext(path)[1] not in LEVEL_EXTENSIONS:
+                continue
+            if path.endswith(".txt"):
+                entries.append((path, 0))
+                continue
+            try:
+                count = self._file(path).count
+            except (OSError, ValueError, KeyError):
+                continue  # half-written or not a level export
+            entries += [(path, position) for position in range(count)]
+        with self.files_lock:
+            for path in self.files.keys() - set(paths):
+                self.files.pop(path).close()
+        return entries
+
+    def layout(self, index):
+        with self.lock:
+            layout = self.layouts.get(index)
+            if layout is not None:
+                return layout
+            if not 0 <= index < len(self.entries):
+                raise IndexError(f"no level {index}")
+            path, position = self.entries[index]
+            version = self.versions.get(index, 0)
+        layout = fit_layout(self._file(path).rows(position), not path.endswith(".txt"))
+        with self.lock:
+            # A refresh during the read means the layout may be out of date
+            if self.versions.get(index, 0) == version:
+                self.layouts[index] = layout
+        return layout
+
+    def _build(self, index):
+        with self.lock:
+            if index in self.built or index >= self.count:
+                return
+            version = self.versions.get(index, 0)
+        level = create_level(self.layout(index))
+        with self.lock:
+            if self.versions.get(index, 0) == version:
+                self.built.setdefault(index, level)
+
+    def refresh(self, changed, added=(), removed=()):
+        """Drop cached levels for changed files; returns their indices.
+
+        Adding or removing a file, or changing an export (which may now
+        hold a different number of levels), shifts the indices, so
+        everything is dropped and every index is returned.
+        """
+        exports = {path for path in changed
+                   if os.path.splitext(path)[1] in LEVEL_EXTENSIONS[1:]}
+        with self.lock:
+            if added or removed or exports:
+                self.entries = self._scan()
+                stale = set(range(max(self.count, len(self.entries))))
+                self.layouts = {} if self.entries else dict(enumerate(self.fallback))
+                self.count = len(self.entries) or len(self.fallback)
+            else:
+                stale = {index for index, (path, _) in enumerate(self.entries)
+                         if path in changed}
+                for index in stale:
+                    self.layouts.pop(index, None)
+            for index in stale:
+                self.built.pop(index, None)
+                self.versions[index] = self.versions.get(index, 0) + 1
+        return stale
+
+    def _work(self):
+        while True:
+            index = self.requests.get()
+            try:
+                self._build(index)
+            except (OSError, pygame.error, IndexError):
+                pass  # the file went away or changed under us
+            except Exception:
+                # Keep the worker alive; a bad level shouldn't end prefetching
+                traceback.print_exc()
+
+    def prefetch(self, *indices):
+        for index in indices:
+            if 0 <= index < self.count:
+                self.requests.put(index)
+
+    def get(self, index):
+        with self.lock:
+            level = self.built.pop(index, None)
+        if level is None:
+            level = create_level(self.layout(index))
+        self.prefetch(index)
+        return level
+
 def main():
+    init_pygame()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     clock = pygame.time.Clock()
     
     overworld = Overworld()
+    stats = Stats()
+    pygame.display.set_caption(stats.summary())
+    # Also used when adaptive pacing needs cheaper frames
+    renderer = DirtyRenderer(screen, SKY_BLUE)
+    drawing_dirty = DIRTY_RECTS
+    pacer = FixedStep(FPS)
+    registry = LevelRegistry()
+    registry.prefetch(overworld.current_node, overworld.current_node + 1)
+    # Edited level files are picked up without restarting
+    watcher = LevelWatcher(registry.level_dir, pattern="*")
+    diagnostics = MemoryDiagnostics("smb4k") if MEMDIAG else None
+    if diagnostics:
+        diagnostics.watch('built levels', lambda: len(registry.built))
     game_state = "overworld"  # overworld | level | game_over
     
     while True:
+        changes = watcher.poll()
+        if any(changes):
+            reloaded = registry.refresh(*changes)
+            overworld.drawn_node = None
+            if game_state == "level" and current_level in reloaded:
+                if current_level < len(registry):
+                    # Swap the geometry under the player, who stays put
+                    platforms, coins, pickups = registry.get(current_level)
+                    renderer.set_scene(platforms, coins, player)
+                else:
+                    game_state = "overworld"
+            if overworld.current_node >= len(registry):
+                overworld.current_node = max(len(registry) - 1, 0)
+            registry.prefetch(overworld.current_node)
+        
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
@@ -149,37 +341,74 @@ def main():
                 
             if game_state == "overworld":
                 if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RIGHT and overworld.current_node < 4:
+                    last_node = min(len(overworld.level_nodes), len(registry)) - 1
+                    if event.key == pygame.K_RIGHT and overworld.current_node < last_node:
                         overworld.current_node += 1
                     if event.key == pygame.K_LEFT and overworld.current_node > 0:
                         overworld.current_node -= 1
+                    if event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                        node = overworld.current_node
+                        registry.prefetch(node, node - 1, node + 1)
                     if event.key == pygame.K_RETURN:
                         game_state = "level"
                         current_level = overworld.current_node
-                        platforms, coins = create_level(level_layouts[current_level])
+                        platforms, coins, pickups = registry.get(current_level)
                         player = Player()
                         player.rect.topleft = (100, HEIGHT - 150)
+                        overworld.drawn_node = None
+                        renderer.set_scene(platforms, coins, player)
+                        pacer.reset()
         
         if game_state == "level":
-            player.update(platforms)
-            
-            # Check coin collection
-            coins_collected = pygame.sprite.spritecollide(player, coins, True)
+            # Physics runs at a fixed rate however long frames take
+            for _ in range(pacer.advance(clock.get_rawtime())):
+                pacer.remember(player)
+                player.update(platforms)
+                
+                # Check coin collection
+                coins_collected = pickups.collect(player.rect)
+                if coins_collected:
+                    stats.record('coin', len(coins_collected))
+                    pygame.display.set_caption(stats.summary())
+                
+                # Return to overworld when reaching end
+                if player.rect.x >= WIDTH - TILE_SIZE:
+                    stats.record('level')
+                    pygame.display.set_caption(stats.summary())
+                    game_state = "overworld"
+                    break
+        
+        # A step may have left the level; then this frame shows the map
+        if game_state == "level":
+            # Under load, repaint only what moved rather than the whole scene
+            if drawing_dirty != (DIRTY_RECTS or pacer.degraded):
+                drawing_dirty = not drawing_dirty
+                renderer.invalidate()
             
             # Draw level
-            screen.fill(SKY_BLUE)
-            platforms.draw(screen)
-            coins.draw(screen)
-            screen.blit(player.image, player.rect)
-            
-            # Return to overworld when reaching end
-            if player.rect.x >= WIDTH - TILE_SIZE:
-                game_state = "overworld"
+            with pacer.interpolated(player):
+                if drawing_dirty:
+                    renderer.draw()
+                else:
+                    screen.fill(SKY_BLUE)
+                    platforms.draw(screen)
+                    coins.draw(screen)
+                    screen.blit(player.image, player.rect)
         
         elif game_state == "overworld":
+            # The dirty-rect mode leaves an unchanged map on screen
+            if DIRTY_RECTS and overworld.drawn_node == overworld.current_node:
+                if diagnostics:
+                    diagnostics.tick()
+                clock.tick(FPS)
+                continue
             overworld.draw(screen)
         
-        pygame.display.flip()
+        if game_state == "overworld" or not drawing_dirty:
+            pygame.display.flip()
+        first_frame()
+        if diagnostics:
+            diagnostics.tick()
         clock.tick(FPS)
 
 if __name__ == "__main__":
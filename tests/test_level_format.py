@@ -0,0 +1,86 @@
+import pytest
+
+from level_format import (MAX_PALETTE, MAX_SIDE, LevelArchive, LevelView,
+                          pack_level, unpack_level, write_archive)
+
+
+def _level(tiles, width=13, height=5):
+    # Every tile used at least once, cycled over the grid
+    return [''.join(tiles[(y * width + x) % len(tiles)] for x in range(width))
+            for y in range(height)]
+
+
+@pytest.mark.parametrize("tiles, bits", [
+    (" B", 1),
+    (" BGP", 2),
+    (" BGP|-?CE" + "abcdefg", 4),
+    (''.join(chr(i) for i in range(40, 240)), 8),
+])
+def test_round_trip(tiles, bits):
+    level = _level(tiles)
+    record = pack_level(level)
+    view = LevelView(record)
+    assert view.bits == bits
+    assert view.size == len(record)
+    assert unpack_level(record) == level
+    assert [view.tile(x, 2) for x in range(view.width)] == list(level[2])
+
+
+def test_ragged_rows_are_padded_with_sky():
+    assert unpack_level(pack_level(["BB", "", "B  B"])) == ["BB  ", "    ", "B  B"]
+
+
+def test_empty_level():
+    assert unpack_level(pack_level([])) == []
+
+
+def test_tile_outside_the_level():
+    view = LevelView(pack_level(["BG"]))
+    with pytest.raises(IndexError):
+        view.tile(2, 0)
+
+
+def test_full_palette():
+    row = ''.join(chr(i) for i in range(MAX_PALETTE))
+    assert unpack_level(pack_level([row])) == [row]
+
+
+def test_palette_too_large():
+    with pytest.raises(ValueError):
+        pack_level([''.join(chr(i) for i in range(MAX_PALETTE + 1))])
+
+
+def test_widest_level():
+    row = "B" * MAX_SIDE
+    assert unpack_level(pack_level([row])) == [row]
+
+
+@pytest.mark.parametrize("level", [
+    ["B" * (MAX_SIDE + 1)],
+    [""] * (MAX_SIDE + 1),
+])
+def test_level_too_large(level):
+    with pytest.raises(ValueError):
+        pack_level(level)
+
+
+def test_archive_round_trip(tmp_path):
+    levels = [_level(" B"), _level(" BGP|", width=40), ["C"]]
+    path = tmp_path / "levels.smba"
+    assert write_archive(path, levels) == len(levels)
+    with LevelArchive(path) as archive:
+        assert len(archive) == len(levels)
+        assert [view.rows() for view in archive] == levels
+        assert archive[-1].rows() == levels[-1]
+        with pytest.raises(IndexError):
+            archive.level(len(levels))
+
+
+def test_archive_rejects_other_files(tmp_path):
+    path = tmp_path / "level.txt"
+    path.write_text("BBBB\n")
+    with pytest.raises(ValueError):
+        LevelArchive(path)
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        LevelArchive(path)
@@ -0,0 +1,42 @@
+from jump_tables import TABLES
+from level_solver import GOAL, find_path, is_solvable
+
+
+def _gap(width, length=20, height=6):
+    # Ground with a ``width``-tile pit after the first five tiles
+    floor = "B" * 5 + " " * width + "B" * (length - 5 - width)
+    return [" " * length] * (height - 1) + [floor]
+
+
+def _wall(tall, length=20, height=8):
+    level = [[" "] * length for _ in range(height)]
+    level[-1] = ["B"] * length
+    for y in range(2, tall + 2):
+        level[-y][8] = "B"
+    return level
+
+
+def test_flat_ground():
+    path = find_path(_gap(0))
+    assert path[0] == (0, 4)
+    assert path[-1] == GOAL
+
+
+def test_widest_gap_is_reachable():
+    assert is_solvable(_gap(TABLES.reach_tiles))
+
+
+def test_gap_past_the_jump_is_unreachable():
+    assert not is_solvable(_gap(TABLES.reach_tiles + 1))
+
+
+def test_highest_wall_is_reachable():
+    assert is_solvable(_wall(TABLES.apex_tiles))
+
+
+def test_wall_above_the_apex_is_unreachable():
+    assert not is_solvable(_wall(TABLES.apex_tiles + 1))
+
+
+def test_nowhere_to_stand():
+    assert not is_solvable([" " * 10] * 4)
@@ -0,0 +1,193 @@
+import hashlib
+import multiprocessing
+import os
+import struct
+import sys
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from map_elites import level_rows
+from tiles import TILE_COLORS
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "thumbnails")
+# Most thumbnails kept in memory; the least recently used are dropped first
+MEMORY_SIZE = 4096
+
+SKY_BLUE = (135, 206, 235)
+
+# Colour per tile byte; anything unknown is sky
+PALETTE = np.array([SKY_BLUE] * 256, dtype=np.uint8)
+for _tile, _color in TILE_COLORS.items():
+    PALETTE[ord(_tile)] = _color
+
+
+def _chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data)))
+
+
+def encode_png(pixels):
+    """PNG bytes for an (height, width, 3) uint8 RGB array."""
+    height, width, _ = pixels.shape
+    # Filter type 0 (none) at the start of every scanline
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = pixels.reshape(height, width * 3)
+    return (b'\x89PNG\r\n\x1a\n'
+            + _chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + _chunk(b'IDAT', zlib.compress(raw.tobytes(), 6))
+            + _chunk(b'IEND', b''))
+
+
+def _grid_rows(level):
+    # The rows exactly as rendered: padded to the widest one
+    rows = level_rows(level)
+    width = max((len(row) for row in rows), default=0)
+    return [row.ljust(width) for row in rows], width
+
+
+def thumbnail_key(level):
+    """Hash of the tile grid a thumbnail is drawn from.
+
+    Unlike level_store.level_hash this keeps trailing spaces, since they
+    set the rendered width.
+    """
+    rows, _ = _grid_rows(level)
+    return hashlib.blake2b('\n'.join(rows).encode('latin-1'), digest_size=16).digest()
+
+
+def render_thumbnail(level, scale=2):
+    """PNG bytes for a level, ``scale`` pixels per tile."""
+    rows, width = _grid_rows(level)
+    if not width:
+        return encode_png(np.zeros((1, 1, 3), dtype=np.uint8) + PALETTE[ord(' ')])
+    grid = np.frombuffer(''.join(rows).encode('latin-1'),
+                         dtype=np.uint8).reshape(len(rows), width)
+    pixels = PALETTE[grid]
+    if scale > 1:
+        pixels = pixels.repeat(scale, axis=0).repeat(scale, axis=1)
+    return encode_png(pixels)
+
+
+def render_tensor(tiles, palette, scale=2):
+    """PNG bytes for each level of an (n, height, width) tile-index tensor.
+
+    ``palette`` is the string mapping indices to tiles, as in
+    generation_api; the whole batch is coloured with one lookup.
+    """
+    colors = PALETTE[np.frombuffer(palette.encode('latin-1'), dtype=np.uint8)]
+    pixels = colors[tiles]
+    if scale > 1:
+        pixels = pixels.repeat(scale, axis=1).repeat(scale, axis=2)
+    return [encode_png(level) for level in pixels]
+
+
+def _render_batch(levels, scale):
+    return [render_thumbnail(level, scale) for level in levels]
+
+
+class ThumbnailCache:
+    """Level thumbnails rendered across a process pool, cached by grid hash.
+
+    The most recently used ``memory_size`` PNGs are kept in memory and all
+    of them are written to ``directory`` so later runs skip them too.
+    ``render_many`` sends only the misses to the pool, batched so each task
+    is worth a round trip. The pool uses the spawn context, like the
+    simulator, so it is safe to start from a Tk app.
+    """
+    def __init__(self, scale=2, directory=CACHE_DIR, workers=None, batch=64,
+                 memory_size=MEMORY_SIZE):
+        self.scale = scale
+        self.directory = directory
+        self.batch = batch
+        self.workers = workers or os.cpu_count() or 1
+        self.memory = OrderedDict()
+        self.memory_size = memory_size
+        self.pool = ProcessPoolExecutor(self.workers, multiprocessing.get_context("spawn"))
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key.hex()}_{self.scale}.png")
+
+    def _remember(self, key, png):
+        self.memory[key] = png
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def _cached(self, key):
+        png = self.memory.get(key)
+        if png is not None:
+            self.memory.move_to_end(key)
+            return png
+        try:
+            with open(self._path(key), 'rb') as f:
+                png = f.read()
+        except OSError:
+            return None
+        self._remember(key, png)
+        return png
+
+    def _store(self, key, png):
+        self._remember(key, png)
+        with open(self._path(key), 'wb') as f:
+            f.write(png)
+
+    def get(self, level):
+        return self.render_many([level])[0]
+
+    def render_many(self, levels):
+        """PNG bytes for each of ``levels``, in order."""
+        keys = [thumbnail_key(level) for level in levels]
+        result = [self._cached(key) for key in keys]
+        missing = {}
+        for i, png in enumerate(result):
+            if png is None:
+                missing.setdefault(keys[i], []).append(i)
+        if not missing:
+            return result
+
+        todo = [levels[indices[0]] for indices in missing.values()]
+        batches = [todo[i:i + self.batch] for i in range(0, len(todo), self.batch)]
+        futures = [self.pool.submit(_render_batch, batch, self.scale) for batch in batches]
+        pngs = [png for future in futures for png in future.result()]
+        for (key, indices), png in zip(missing.items(), pngs):
+            self._store(key, png)
+            for i in indices:
+                result[i] = png
+        return result
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _benchmark(count=5000):
+    import tempfile
+    from level_solver import _random_level
+
+    levels = [_random_level(width=200) for _ in range(count)]
+    start = time.perf_counter()
+    _render_batch(levels[:500], 2)
+    print(f"one process: {500 / (time.perf_counter() - start):.0f} thumbnails/s")
+    with tempfile.TemporaryDirectory() as directory, ThumbnailCache(directory=directory) as cache:
+        cache.get(levels[0])  # start the workers
+        start = time.perf_counter()
+        cache.render_many(levels)
+        print(f"pool of {cache.workers}: "
+              f"{count / (time.perf_counter() - start):.0f} thumbnails/s")
+        start = time.perf_counter()
+        cache.render_many(levels)
+        print(f"cached: {count / (time.perf_counter() - start):.0f} thumbnails/s")
+
+
+if __name__ == "__main__":
+    _benchmark(*map(int, sys.argv[1:2]))
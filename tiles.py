@@ -0,0 +1,13 @@
+# Tiles the player collides with across the different level formats
+SOLID_TILES = frozenset('BGP|')
+
+# Fill colour per tile character, for the loaders and thumbnails
+TILE_COLORS = {
+    'B': (139, 69, 19),    # Block
+    'G': (101, 67, 33),    # Ground
+    'P': (34, 139, 34),    # Platform
+    '|': (0, 0, 255),      # Pipe
+    'C': (255, 255, 0),    # Coin
+    'E': (255, 0, 0),      # Enemy
+    '-': (255, 165, 0),    # Bridge
+}
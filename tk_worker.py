@@ -0,0 +1,86 @@
+import queue
+import threading
+
+
+class Cancelled(Exception):
+    """Raised inside a job's work function once the job is cancelled."""
+
+
+class BackgroundJob:
+    """Run ``work(job)`` on a worker thread and report back on the Tk thread.
+
+    The work function calls ``job.report(done, total, best)`` as it goes and
+    ``job.check()`` at safe points, which raises Cancelled after ``cancel``.
+    Messages travel through a queue that is drained with ``root.after``, so
+    the callbacks ``on_progress(done, total, best)``, ``on_done(result)``,
+    ``on_error(exc)`` and ``on_finish()``, called last however the job
+    ended, always run on the Tk main thread.
+    """
+    def __init__(self, root, work, on_progress=None, on_done=None,
+                 on_error=None, on_finish=None, poll_ms=50):
+        self.root = root
+        self.work = work
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_finish = on_finish
+        self.poll_ms = poll_ms
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.finished = False
+
+    def start(self):
+        self.thread.start()
+        self.root.after(self.poll_ms, self._poll)
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise Cancelled()
+
+    def report(self, done, total, best=None):
+        self.messages.put(("progress", (done, total, best)))
+
+    def _run(self):
+        try:
+            result = self.work(self)
+        except Cancelled:
+            self.messages.put(("cancelled", None))
+        except Exception as exc:
+            self.messages.put(("error", exc))
+        else:
+            self.messages.put(("done", result))
+
+    def _poll(self):
+        # Only the newest progress update matters; older ones are skipped
+        progress = None
+        while True:
+            try:
+                kind, payload = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                progress = payload
+                continue
+            if progress and self.on_progress:
+                self.on_progress(*progress)
+            progress = None
+            self.finished = True
+            if kind == "done" and self.on_done:
+                self.on_done(payload)
+            elif kind == "error" and self.on_error:
+                self.on_error(payload)
+            if self.on_finish:
+                self.on_finish()
+            return
+        if progress and self.on_progress:
+            self.on_progress(*progress)
+        self.root.after(self.poll_ms, self._poll)